@@ -0,0 +1,112 @@
+from itertools import combinations
+
+from pysmt.shortcuts import FreshSymbol, And, Implies, EqualsOrIff, TRUE, BOOL, get_env
+from pysmt.walkers import IdentityDagWalker
+
+from cdcl_vsids import CDCLSolver
+from preprocess import Preprocessor
+from tseytin import tseitin_dimacs
+
+
+class Ackermannizer(IdentityDagWalker):
+    """ Rebuild a formula with a fresh constant for every function application, innermost first. """
+    def __init__(self, env):
+        IdentityDagWalker.__init__(self, env=env)
+        # function -> the replaced arguments and the constant of each of its applications
+        self.applications = {}
+
+    def walk_function(self, formula, args, **kwargs):
+        constant = FreshSymbol(formula.get_type(), template="ack_%d")
+        self.applications.setdefault(formula.function_name(), []).append((args, constant))
+        return constant
+
+
+def ackermannize(formula):
+    """
+    Replace every function application f(t1, ..., tn) of formula by a fresh constant, and
+    return the result conjoined with the functional-consistency constraints: for every two
+    applications of the same function, equal arguments imply equal constants. The result
+    has no function symbols left and is equisatisfiable with formula.
+    """
+    ackermannizer = Ackermannizer(get_env())
+    replaced = ackermannizer.walk(formula)
+    constraints = []
+    for apps in ackermannizer.applications.values():
+        for (args1, c1), (args2, c2) in combinations(apps, 2):
+            equal_args = [EqualsOrIff(x, y) for x, y in zip(args1, args2) if x != y]
+            constraints.append(Implies(And(equal_args), EqualsOrIff(c1, c2)))
+    return And([replaced] + constraints)
+
+
+def chordal_triangles(edges):
+    """
+    Make the graph of edges chordal by eliminating its vertices, the one with the fewest
+    neighbours first, and connecting the remaining neighbours of each eliminated vertex.
+    Return the triangles formed along the way; every triangle of the chordal graph is one of them.
+    """
+    neighbours = {}
+    for a, b in edges:
+        neighbours.setdefault(a, set()).add(b)
+        neighbours.setdefault(b, set()).add(a)
+    triangles = []
+    while neighbours:
+        v = min(neighbours, key=lambda u: (len(neighbours[u]), u.node_id()))
+        for a, b in combinations(sorted(neighbours[v], key=lambda u: u.node_id()), 2):
+            neighbours[a].add(b)
+            neighbours[b].add(a)
+            triangles.append((v, a, b))
+        for u in neighbours.pop(v):
+            neighbours[u].discard(v)
+    return triangles
+
+
+def encode_equalities(formula):
+    """
+    Replace every equality between constants of formula by a Boolean variable. Return the
+    result, and the triangles (x = y, y = z, x = z) of the chordal completion of the equality
+    graph: transitivity over them is enough to rule out the assignments that no equality
+    relation agrees with.
+    """
+    variables = {}
+
+    def variable(a, b):
+        if a == b:
+            return TRUE()
+        key = (a, b) if a.node_id() < b.node_id() else (b, a)
+        if key not in variables:
+            variables[key] = FreshSymbol(BOOL, template="eq_%d")
+        return variables[key]
+
+    atoms = [atom for atom in formula.get_atoms() if atom.is_equals()]
+    encoded = formula.substitute({atom: variable(*atom.args()) for atom in atoms})
+    triangles = [(variable(v, a), variable(a, b), variable(v, b)) for v, a, b in chordal_triangles(list(variables))]
+    return encoded, triangles
+
+
+def ackermann_solve(formula):
+    """
+    Decide a quantifier-free formula with uninterpreted functions eagerly: ackermannize it,
+    encode its equalities, and run the SAT solver once on the propositional result.
+    """
+    encoded, triangles = encode_equalities(ackermannize(formula))
+    encoded = encoded.simplify()
+    if encoded.is_false():
+        return "unsat"
+    if encoded.is_true():
+        # all the equalities true satisfy every transitivity clause
+        return "sat"
+    cnf, var_to_int, int_to_var = tseitin_dimacs(encoded, polarity=True)
+    num_vars = max(abs(l) for clause in cnf for l in clause)
+
+    # The transitivity clauses are already in CNF, they go to the solver directly
+    def var_id(var):
+        nonlocal num_vars
+        if var not in var_to_int:
+            num_vars += 1
+            var_to_int[var] = num_vars
+        return var_to_int[var]
+
+    for triangle in triangles:
+        x, y, z = (var_id(var) for var in triangle)
+        cnf += [[-x, -y, z], [-x, -z, y], [-y, -z, x]]
+    return "sat" if CDCLSolver().cdcl_solve(Preprocessor(cnf).simplify()) is not None else "unsat"
@@ -0,0 +1,298 @@
+# Micro-benchmarks for the solver components.
+# usage: python3 benchmarks.py [name ...]   (runs every benchmark when no name is given)
+import glob
+import importlib.util
+import random
+import sys
+import time
+
+from pysmt.shortcuts import Symbol, BVType, BV, BVAdd, BVAnd, BVOr, BVMul, Equals, Not, And, Or, Implies, Function, \
+    EqualsOrIff, BOOL, INT, reset_env
+from pysmt.typing import FunctionType
+from pysmt.smtlib.parser import SmtLibParser
+
+from ackermann import ackermann_solve
+from bv_solver import bit_blasting, BitBlaster, BVRewriter
+from cc_solver import cc_solver, CongruenceClosure
+from tr import flattening, get_boolean_skeleton
+from tseytin import tseitin_dimacs
+from cdcl_vsids import CDCLSolver
+from preprocess import Preprocessor
+
+
+def read_formula(path):
+    """ Parse an smt2 file and return its last asserted formula. """
+    with open(path, "r") as f:
+        return SmtLibParser().get_script(f).get_last_formula()
+
+
+def bv_cnf(formula):
+    """ Run the bv_solver pipeline up to the CNF handed to the SAT solver. """
+    return bit_blasting(list(formula.args()) if formula.is_and() else [formula])
+
+
+def cdcl_steps(repeat=20):
+    """ Rule-loop steps per second of CDCLSolver.cdcl_solve on the bv_cube_benchmarks CNFs. """
+    print(f"{'file':<12} {'clauses':>8} {'steps':>8} {'steps/sec':>10}")
+    total_steps, total_time = 0, 0.0
+    for path in sorted(glob.glob("bv_cube_benchmarks/*.smt2")):
+        cnf = bv_cnf(read_formula(path))
+        steps = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            solver = CDCLSolver()
+            solver.cdcl_solve(cnf)
+            steps += solver.steps
+        elapsed = time.perf_counter() - start
+        print(f"{path.split('/')[-1]:<12} {len(cnf):>8} {steps // repeat:>8} {steps / elapsed:>10.0f}")
+        total_steps += steps
+        total_time += elapsed
+    print(f"{'total':<12} {'':>8} {total_steps // repeat:>8} {total_steps / total_time:>10.0f}")
+
+
+def width_cube(width):
+    """ A satisfiable cube of additions and bitwise operations over width-bit vectors. """
+    x, y, z = (Symbol(f"{name}{width}", BVType(width)) for name in "xyz")
+    return [Equals(z, BVAdd(x, y)),
+            Equals(BVAnd(x, y), BV(1, width)),
+            Not(Equals(z, BVOr(x, y))),
+            Not(Equals(BVAdd(z, x), BVAdd(y, BV(3, width))))]
+
+
+def bv_width(widths=(4, 8, 16, 32, 64), repeat=5):
+    """ Clause count and time of blasting and solving width_cube with a fresh BitBlaster, per width. """
+    print(f"{'width':>6} {'vars':>7} {'clauses':>8} {'blast ms':>9} {'solve ms':>9} {'result':>7}")
+    for width in widths:
+        cube = width_cube(width)
+        blast_time = solve_time = 0.0
+        for _ in range(repeat):
+            blaster = BitBlaster()
+            start = time.perf_counter()
+            for lit in cube:
+                blaster.blast(lit.arg(0) if lit.is_not() else lit)
+            blast_time += time.perf_counter() - start
+            start = time.perf_counter()
+            model = blaster.check(cube)
+            solve_time += time.perf_counter() - start
+        print(f"{width:>6} {blaster.num_vars:>7} {blaster.live_clauses:>8} {1000 * blast_time / repeat:>9.1f} "
+              f"{1000 * solve_time / repeat:>9.1f} {'sat' if model is not None else 'unsat':>7}")
+
+
+def bv_mul(widths=(4, 8, 16, 32)):
+    """
+    Clauses of the array and the Wallace tree multipliers: for x * y = z per width,
+    and for all the theory atoms of every bvmul_benchmarks file.
+    """
+    def clauses(atoms, multiplier):
+        blaster = BitBlaster(multiplier=multiplier)
+        for atom in atoms:
+            blaster.blast(atom)
+        return len(blaster.clauses)
+
+    print(f"{'':<12} {'array':>8} {'wallace':>8}")
+    for width in widths:
+        x, y, z = (Symbol(f"{name}{width}", BVType(width)) for name in "xyz")
+        atoms = [Equals(BVMul(x, y), z)]
+        print(f"{f'width {width}':<12} {clauses(atoms, 'array'):>8} {clauses(atoms, 'wallace'):>8}")
+    for path in sorted(glob.glob("bvmul_benchmarks/*.smt2")):
+        atoms = read_formula(path).get_atoms()
+        print(f"{path.split('/')[-1]:<12} {clauses(atoms, 'array'):>8} {clauses(atoms, 'wallace'):>8}")
+
+
+def bv_rewrite():
+    """ Clauses of the theory atoms of every bit-vector benchmark, blasted as is and after BVRewriter. """
+    print(f"{'file':<30} {'rewrites':>8} {'clauses':>8} {'rewritten':>9}")
+    for path in sorted(glob.glob("bv*_benchmarks/*.smt2")):
+        atoms = read_formula(path).get_atoms()
+        plain, rewritten = BitBlaster(), BitBlaster()
+        rewriter = BVRewriter()
+        for atom in atoms:
+            plain.blast(atom)
+            atom = rewriter.rewrite(atom)
+            if not atom.is_constant():
+                rewritten.blast(atom)
+        print(f"{path:<30} {rewriter.num_rewrites:>8} {len(plain.clauses):>8} {len(rewritten.clauses):>9}")
+
+
+def deep_term(size, rng):
+    """ A random term with size applications of f and g, most of them over recent subterms. """
+    f = Symbol("f", FunctionType(INT, [INT]))
+    g = Symbol("g", FunctionType(INT, [INT, INT]))
+    terms = [Symbol(name, INT) for name in "abc"]
+    for _ in range(size):
+        if rng.random() < 0.5:
+            terms.append(Function(f, [rng.choice(terms[-5:])]))
+        else:
+            terms.append(Function(g, [rng.choice(terms[-5:]), rng.choice(terms)]))
+    return terms[-1]
+
+
+def flattening_time(sizes=(10, 100, 1000, 10000)):
+    """ Time of tr.flattening on cubes of four literals over deep random terms. """
+    p = Symbol("p", FunctionType(BOOL, [INT]))
+    print(f"{'size':>6} {'literals':>9} {'ms':>8}")
+    for size in sizes:
+        rng = random.Random(size)
+        a, b, c, d = (deep_term(size, rng) for _ in range(4))
+        cube = [EqualsOrIff(a, b), Not(EqualsOrIff(b, c)), Function(p, [c]), Not(Function(p, [d]))]
+        start = time.perf_counter()
+        flat = flattening(cube)
+        print(f"{size:>6} {len(flat.args()):>9} {1000 * (time.perf_counter() - start):>8.1f}")
+
+
+def cc_time(sizes=(10, 30, 100, 300, 1000)):
+    """ Time of cc_solver on cubes of equalities between deep random terms, and one disequality. """
+    print(f"{'size':>6} {'literals':>9} {'ms':>8} {'result':>7}")
+    for size in sizes:
+        rng = random.Random(size)
+        terms = [deep_term(size, rng) for _ in range(6)]
+        cube = [EqualsOrIff(a, b) for a, b in zip(terms, terms[1:-1])] + [Not(EqualsOrIff(terms[0], terms[-1]))]
+        cube = list(flattening(cube).args())
+        start = time.perf_counter()
+        classes = cc_solver(cube)
+        print(f"{size:>6} {len(cube):>9} {1000 * (time.perf_counter() - start):>8.1f} "
+              f"{'sat' if classes is not None else 'unsat':>7}")
+
+
+def cc_incremental(sizes=(10, 30, 100)):
+    """
+    Feeding a cube to congruence closure one literal at a time, as DPLL(T) does along
+    the trail: one CongruenceClosure with push and assert_literal per literal, against
+    a fresh cc_solver call on every prefix.
+    """
+    print(f"{'size':>6} {'literals':>9} {'incremental ms':>15} {'from scratch ms':>16}")
+    for size in sizes:
+        rng = random.Random(size)
+        terms = [deep_term(size, rng) for _ in range(6)]
+        cube = [EqualsOrIff(a, b) for a, b in zip(terms, terms[1:-1])] + [Not(EqualsOrIff(terms[0], terms[-1]))]
+        cube = list(flattening(cube).args())
+        start = time.perf_counter()
+        cc = CongruenceClosure()
+        for lit in cube:
+            cc.push()
+            cc.assert_literal(lit)
+        incremental = time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(1, len(cube) + 1):
+            cc_solver(cube[:i])
+        scratch = time.perf_counter() - start
+        print(f"{size:>6} {len(cube):>9} {1000 * incremental:>15.1f} {1000 * scratch:>16.1f}")
+
+
+def uf_modes(sizes=(5, 10, 20, 30)):
+    """
+    Time of the lazy DPLL(T) loop of dpllt-solver.py against ackermann_solve, on the
+    uf_benchmarks files and on disjunctions of chains of equalities between deep random terms.
+    """
+    spec = importlib.util.spec_from_file_location("dpllt_solver", "dpllt-solver.py")
+    dpllt_solver = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(dpllt_solver)
+
+    def chain(size):
+        rng = random.Random(size)
+        terms = [deep_term(size, rng) for _ in range(6)]
+        chain = And([EqualsOrIff(a, b) for a, b in zip(terms, terms[1:-1])])
+        return And(Or(chain, EqualsOrIff(terms[0], terms[2])), Not(EqualsOrIff(terms[0], terms[-1])))
+
+    formulas = [(path.split("/")[-1], lambda path=path: read_formula(path))
+                for path in sorted(glob.glob("uf_benchmarks/*.smt2"))]
+    def dropped_atom():
+        # The preprocessor removes every clause of f(a) = f(b), congruence still explains over it
+        a, b, c = (Symbol(name, INT) for name in "abc")
+        f = Symbol("f", FunctionType(INT, [INT]))
+        fa_fb = EqualsOrIff(Function(f, [a]), Function(f, [b]))
+        return And(Or(EqualsOrIff(a, b), EqualsOrIff(b, c)), Or(EqualsOrIff(a, b), EqualsOrIff(b, c), fa_fb),
+                   EqualsOrIff(a, b))
+
+    formulas += [(f"size {size}", lambda size=size: chain(size)) for size in sizes]
+    formulas.append(("dropped atom", dropped_atom))
+    print(f"{'formula':<22} {'lazy ms':>9} {'ackermann ms':>13} {'result':>7}")
+    for name, make_formula in formulas:
+        # the files declare the same function symbols over different sorts
+        reset_env()
+        formula = make_formula()
+        start = time.perf_counter()
+        lazy = dpllt_solver.dpll_t(formula)
+        lazy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        eager = ackermann_solve(formula)
+        eager_time = time.perf_counter() - start
+        assert lazy == eager, name
+        print(f"{name:<22} {1000 * lazy_time:>9.1f} {1000 * eager_time:>13.1f} {lazy:>7}")
+
+
+def tseitin_size():
+    """ Variables and clauses of the CNF of every benchmark's Boolean skeleton, with and without polarity. """
+    print(f"{'file':<36} {'vars':>6} {'clauses':>8} {'pg vars':>8} {'pg clauses':>11}")
+    for path in sorted(glob.glob("*_benchmarks/*.smt2")):
+        reset_env()
+        skeleton = get_boolean_skeleton(read_formula(path))[0]
+        sizes = []
+        for polarity in (False, True):
+            cnf, var_to_int, int_to_var = tseitin_dimacs(skeleton, polarity=polarity)
+            sizes += [max(abs(l) for clause in cnf for l in clause), len(cnf)]
+        print(f"{path:<36} {sizes[0]:>6} {sizes[1]:>8} {sizes[2]:>8} {sizes[3]:>11}")
+
+
+def tseitin_time(depths=(1000, 10000, 100000)):
+    """ Time of tseitin_dimacs on a skeleton nested depth levels deep, far past the recursion limit. """
+    print(f"{'depth':>7} {'clauses':>8} {'ms':>8}")
+    for depth in depths:
+        symbols = [Symbol(f"t{i}", BOOL) for i in range(depth)]
+        formula = symbols[0]
+        for i in range(1, depth):
+            formula = Or(And(symbols[i], formula), Not(symbols[i - 1])) if i % 2 else Implies(formula, symbols[i])
+        start = time.perf_counter()
+        cnf, var_to_int, int_to_var = tseitin_dimacs(formula, polarity=True)
+        print(f"{depth:>7} {len(cnf):>8} {1000 * (time.perf_counter() - start):>8.1f}")
+
+
+def preprocess(repeat=3):
+    """
+    Clauses of the CNF of every bit-vector cube benchmark, with a unit clause per literal
+    of the cube, before and after Preprocessor, and the time to preprocess it and to
+    solve it either way. Checks that extend_model turns a model of the simplified CNF into
+    one of the original CNF.
+    """
+    print(f"{'file':<30} {'clauses':>8} {'after':>6} {'pre ms':>7} {'solve ms':>9} {'after ms':>9} {'result':>7}")
+    for path in sorted(glob.glob("bv_cube_benchmarks/*.smt2") + glob.glob("bvmul_benchmarks/*.smt2")):
+        # the files declare the same symbols over different widths
+        reset_env()
+        cnf = bv_cnf(read_formula(path))
+        start = time.perf_counter()
+        preprocessor = Preprocessor(cnf)
+        simplified = preprocessor.simplify()
+        pre_time = time.perf_counter() - start
+        solve_times = []
+        for clauses in (cnf, simplified):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                CDCLSolver().cdcl_solve([list(clause) for clause in clauses])
+            solve_times.append((time.perf_counter() - start) / repeat)
+        model = CDCLSolver().cdcl_solve([list(clause) for clause in simplified])
+        assert (model is None) == (CDCLSolver().cdcl_solve([list(clause) for clause in cnf]) is None), path
+        if model is not None:
+            value = {abs(l): l > 0 for l in preprocessor.extend_model(model)}
+            assert all(any(value[abs(l)] == (l > 0) for l in clause) for clause in cnf), path
+        print(f"{path:<30} {len(cnf):>8} {len(simplified):>6} {1000 * pre_time:>7.1f} "
+              f"{1000 * solve_times[0]:>9.1f} {1000 * solve_times[1]:>9.1f} {'sat' if model is not None else 'unsat':>7}")
+
+
+BENCHMARKS = {
+    "cdcl_steps": cdcl_steps,
+    "bv_width": bv_width,
+    "bv_mul": bv_mul,
+    "bv_rewrite": bv_rewrite,
+    "flattening": flattening_time,
+    "cc_time": cc_time,
+    "cc_incremental": cc_incremental,
+    "uf_modes": uf_modes,
+    "tseitin_size": tseitin_size,
+    "tseitin_time": tseitin_time,
+    "preprocess": preprocess,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        print(f"== {name}")
+        BENCHMARKS[name]()
@@ -0,0 +1,6 @@
+(set-logic QF_BV)
+(set-option :produce-models true)
+(set-option :incremental true)
+(assert (and (not (= #b0010 (bvadd #b0001 #b0001))) (or (= #b1011 (bvand #b0010 #b1010)) (= #b1100 #b0110))))
+(check-sat)
+(exit)
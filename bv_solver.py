@@ -1,167 +1,507 @@
-from pysmt.shortcuts import Symbol, And, Or, Not, BOOL, Iff, Xor
+from collections import OrderedDict
+
+from pysmt.shortcuts import BV, BVAdd, BVAnd, BVOr, BVMul, Equals, TRUE, FALSE
 
 from cdcl_vsids import CDCLSolver
-from flattern_bv import is_flat_cube, flattening
-from tr import cnf_to_dimacs
-from tseytin import tseitin_transformation
+from tr import minimize_explanation
+
+# Clause templates of the gates. Every row is one clause, and lists the sign of each
+# literal of the gate, inputs first and the output last (0: the literal is not in the clause).
+# OR and XNOR are negated AND and XOR gates, so they share the same outputs.
+AND_GATE = ((-1, -1, 1), (1, 0, -1), (0, 1, -1))
+XOR_GATE = ((1, 1, -1), (-1, -1, -1), (1, -1, 1), (-1, 1, 1))
+# Full adder: sum = a ⊕ b ⊕ c, carry = majority(a, b, c)
+SUM_GATE = ((1, 1, 1, -1), (1, 1, -1, 1), (1, -1, 1, 1), (1, -1, -1, -1),
+            (-1, 1, 1, 1), (-1, 1, -1, -1), (-1, -1, 1, -1), (-1, -1, -1, 1))
+CARRY_GATE = ((-1, -1, 0, 1), (-1, 0, -1, 1), (0, -1, -1, 1),
+              (1, 1, 0, -1), (1, 0, 1, -1), (0, 1, 1, -1))
 
 
-def bit_blasting(formula):
+class BVRewriter:
     """
-    Perform bit-blasting on the given formula in bit-vector arithmetic.
-    Assumes all bit-vectors have a width of 4.
+    Word-level simplification of bit-vector terms and atoms, run before bit-blasting.
+    Terms are rewritten bottom-up and memoized per FNode, and num_rewrites counts the
+    rules applied. Commutative operators and equalities get a normal order (constants
+    last, otherwise by node id), so equal terms written in different orders become the
+    same FNode; constants are folded, and the identities below are applied.
     """
-    atomic_vars = []  # Stores equality constraint Boolean variables
-    boolean_vars = {}  # Map to hold the Boolean variables for each bit
-
-    def create_boolean_variables(term):
-        """
-        Create 4 Boolean variables for the given bit-vector term.
-        """
-        if term not in boolean_vars:
-            boolean_vars[term] = [Symbol(f"{str(term)}_{i}", BOOL) for i in
-                                  range(4)]
-        return boolean_vars[term]
-
-    def bitwise_constraints(op, a_bits, b_bits, result_bits):
-        """
-        Generate bitwise constraints for the given bitwise operation (AND, OR).
-        """
-        constraints = []
-        for i in range(4):  # Fixed width of 4 bits
-            if op == "and":
-                constraints.append(
-                    Iff(result_bits[i], And(a_bits[i], b_bits[i])))
-            elif op == "or":
-                constraints.append(
-                    Iff(result_bits[i], Or(a_bits[i], b_bits[i])))
-        return constraints
-
-    def addition_constraints(a_bits, b_bits):
-        """
-        Generate bitwise constraints for bit-vector addition.
-        """
-        result_bits = [Symbol(f"sum_{i}", BOOL) for i in range(4)]
-        carry_bits = [Symbol(f"carry_{i}", BOOL) for i in
-                      range(5)]  # One extra for carry out
-        constraints = []
-        # Carry-in at LSB is always 0
-        constraints.append(Not(carry_bits[0]))
-        for i in range(4):
-            # Compute sum bit: sum[i] = a[i] ⊕ b[i] ⊕ carry[i]
-            constraints.append(Iff(result_bits[i],
-                                   Xor(Xor(a_bits[i], b_bits[i]),
-                                       carry_bits[i])))
-            # Compute carry bit: carry[i+1] = (a[i] & b[i]) | (carry[i] & (a[i] ⊕ b[i]))
-            next_carry = Or(And(a_bits[i], b_bits[i]),
-                            And(carry_bits[i], Xor(a_bits[i], b_bits[i])))
-            constraints.append(Iff(carry_bits[i + 1], next_carry))
-        return result_bits, constraints
-
-    def handle_formula(formula):
-        """
-        Recursively process the formula to generate bit-blasted constraints.
-        """
-        if formula.is_symbol():
-            return create_boolean_variables(formula), []
-
-        elif formula.is_and() or formula.is_or():
-            # Handle AND/OR operations by processing all subformulas
-            all_constraints = []
-            for subformula in formula.args():
-                _, sub_constraints = handle_formula(subformula)
-                all_constraints.extend(sub_constraints)
-            return None, all_constraints
-
-        elif formula.is_bv_and() or formula.is_bv_or():
-            # Handle bitwise operations (AND/OR)
-            a_bits, a_constraints = handle_formula(formula.arg(0))
-            b_bits, b_constraints = handle_formula(formula.arg(1))
-            result_bits = create_boolean_variables(formula)
-            op = "and" if formula.is_bv_and() else "or"
-            constraints = bitwise_constraints(op, a_bits, b_bits, result_bits)
-            return result_bits, a_constraints + b_constraints + constraints
-
-        elif formula.is_equals():
-            # Handle bit-vector equality by ensuring all bits are equal
-            a_bits, a_constraints = handle_formula(formula.arg(0))
-            b_bits, b_constraints = handle_formula(formula.arg(1))
-
-            eq_var = Symbol(f"{formula}_eq",
-                            BOOL)  # Single Boolean variable representing equality
-            atomic_vars.append(eq_var)
-
-            bitwise_equality = [Iff(a_bits[i], b_bits[i]) for i in range(4)]
-            equality_constraint = Iff(eq_var, And(bitwise_equality))
-
-            return [eq_var], a_constraints + b_constraints + [
-                equality_constraint]
-
-
-        elif formula.is_not():
-            # Handle logical NOT (!a)
-            a_bits, a_constraints = handle_formula(formula.arg(0))
-            if len(a_bits) != 1:
-                raise ValueError(
-                    "Logical NOT can only be applied to a single Boolean variable.")
-            atomic_vars.append(Not(atomic_vars.pop()))
-
-            result_var = Symbol(f"{formula}_not", BOOL)
-            constraints = [Iff(result_var, Not(a_bits[0]))]
-
-            return [result_var], a_constraints + constraints
-
-
-        elif formula.is_constant():
-            # Base case: Constant bit-vector
-            constant_value = formula.constant_value()  # Extract the numeric value of the constant
-            result_bits = create_boolean_variables(
-                formula)  # Create Boolean variables for the constant
-            constraints = []
-
-            for i in range(4):  # Iterate over all 4 bits (fixed width)
-                bit_value = (
-                                    constant_value >> i) & 1  # Extract the i-th bit (0 or 1)
-                if bit_value == 1:
-                    # Represent True by directly constraining result_bits[i]
-                    constraints.append(result_bits[i])
-                else:
-                    # Represent False by directly constraining result_bits[i]
-                    constraints.append(Not(result_bits[i]))
-            return result_bits, constraints
-
-        elif formula.is_bv_add():
-            a_bits, a_constraints = handle_formula(formula.arg(0))
-            b_bits, b_constraints = handle_formula(formula.arg(1))
-            result_bits, add_constraints = addition_constraints(a_bits, b_bits)
-            return result_bits, a_constraints + b_constraints + add_constraints
 
+    OPERATORS = {"add": (BVAdd, lambda a, b: a + b), "and": (BVAnd, lambda a, b: a & b),
+                 "or": (BVOr, lambda a, b: a | b), "mul": (BVMul, lambda a, b: a * b)}
+
+    def __init__(self):
+        self.memo = {}
+        self.num_rewrites = 0
+
+    def rewrite(self, term):
+        """ Rewrite term and the terms below it, arguments first, with an explicit stack. """
+        stack = [term]
+        while stack:
+            t = stack[-1]
+            if t in self.memo:
+                stack.pop()
+                continue
+            pending = [arg for arg in t.args() if arg not in self.memo]
+            if pending:
+                stack.extend(reversed(pending))  # Left to right, as a recursion would
+                continue
+            stack.pop()
+            self.memo[t] = self.simplify(t, [self.memo[arg] for arg in t.args()])
+        return self.memo[term]
+
+    def order(self, a, b):
+        """ The arguments of a commutative operator in normal order. """
+        if a.is_constant() or (not b.is_constant() and b.node_id() < a.node_id()):
+            self.num_rewrites += 1
+            return b, a
+        return a, b
+
+    def simplify(self, term, args):
+        """ Rewrite term, whose arguments were already rewritten to args. """
+        if term.is_equals():
+            a, b = self.order(*args)
+            if a == b or (a.is_constant() and b.is_constant()):
+                self.num_rewrites += 1
+                return TRUE() if a == b else FALSE()
+            return Equals(a, b)
+
+        if term.is_bv_add():
+            op = "add"
+        elif term.is_bv_and():
+            op = "and"
+        elif term.is_bv_or():
+            op = "or"
+        elif term.is_bv_mul():
+            op = "mul"
         else:
-            raise NotImplementedError(f"Unsupported operation: {formula}")
+            return term  # Symbols and constants, and whatever the blaster rejects
+        make, evaluate = self.OPERATORS[op]
+        a, b = self.order(*args)
+        ones = (1 << term.bv_width()) - 1
+
+        result = None
+        if b.is_constant():
+            value = b.constant_value()
+            if a.is_constant():
+                result = BV(evaluate(a.constant_value(), value) & ones, term.bv_width())
+            elif (op, value) in (("add", 0), ("and", ones), ("or", 0), ("mul", 1)):
+                result = a  # x + 0, x & 1...1, x | 0, x * 1
+            elif (op, value) in (("and", 0), ("or", ones), ("mul", 0)):
+                result = b  # x & 0, x | 1...1, x * 0
+        elif op in ("and", "or"):
+            if a == b:
+                result = a  # x & x, x | x
+            for x, y in ((a, b), (b, a)):
+                # Absorption: x & (x | y) = x, x | (x & y) = x
+                if (y.is_bv_or() if op == "and" else y.is_bv_and()) and x in y.args():
+                    result = x
+        if result is None:
+            return make(a, b)
+        self.num_rewrites += 1
+        return result
+
+
+class BitBlaster:
+    """
+    Bit-blasts theory literals straight into integer CNF, and keeps it in one CDCLSolver
+    that lives across bv_solver calls. Every term gets one solver literal per bit, and
+    every gate writes its clauses from the templates above into the clause buffer.
+
+    The atoms of a cube are rewritten at the word level by BVRewriter before they are
+    blasted, after substituting the constants of its literals symbol = constant.
+
+    Constant bits are the literals true and -true, and the gates fold them as they are
+    built: x & 0 is 0, x | 1 is 1, x ⊕ 1 is -x, and so on. A gate whose output is
+    known, or equal to one of its inputs, emits no variable and no clause.
+
+    Every term and equality atom is blasted once and cached under its FNode. Its clauses
+    only define it from its arguments, so they hold in every check and stay in the solver.
+    A check switches its atoms on by passing their variables as assumptions, so it only
+    pays for the terms it has not seen before.
+
+    Gates are hash-consed on their inputs, as in an AIG: OR and XNOR are negated AND and
+    XOR gates, and XOR moves negated inputs to its output. So bits computed twice from the
+    same inputs, like those of (bvadd x y) and (bvadd y x), or the partial products of two
+    multipliers over the same bits, get a single variable and a single set of clauses.
+
+    bvmul is blasted by a shift-add array multiplier, or by a Wallace tree when multiplier
+    is "wallace".
+
+    The cache keeps at most max_nodes entries and evicts the least recently used one.
+    The arguments of a term are always used more recently than the term itself, so they
+    are evicted after it. Once the clauses of evicted entries outnumber the live ones,
+    the solver is rebuilt by blasting the live entries again.
+    """
+
+    def __init__(self, max_nodes=5000, multiplier="array"):
+        if multiplier not in ("array", "wallace"):
+            raise ValueError(f"Unknown multiplier: {multiplier}")
+        self.max_nodes = max_nodes
+        self.multiplier = multiplier
+        self.hits = 0
+        self.misses = 0
+        self.core = None  # After an unsat check: the literals of the cube that caused it
+        self.checked = None  # The cube of the last check, that core belongs to
+        self.reset()
 
-    # Start bit-blasting transformation
-    _, constraints = handle_formula(formula)
-    constraints.extend(atomic_vars)  # Add atomic equality constraints
+    def reset(self):
+        self.cache = OrderedDict()  # FNode -> (literals of its bits, number of clauses it added)
+        self.num_vars = 0
+        self.clauses = []  # Every clause emitted since the last reset
+        self.gates = {}  # (template, sorted inputs) -> output of every gate emitted so far
+        self.rewriter = BVRewriter()
+        self.solver = CDCLSolver()
+        # The constant bits: true is a variable fixed by a unit clause, and false is -true
+        self.true = self.new_var()
+        self.clauses.append([self.true])
+        self.solver.add_clause([self.true])
+        self.live_clauses = 0
+        self.dead_clauses = 0
+
+    def new_var(self):
+        self.num_vars += 1
+        return self.num_vars
+
+    def gate(self, template, *inputs):
+        """
+        Return the output of the gate template over inputs. The gates are hash-consed:
+        the clauses of a gate and its output variable are only created the first time
+        it is used with the same inputs, in any order.
+        """
+        key = (template, tuple(sorted(inputs)))
+        if key not in self.gates:
+            out = self.new_var()
+            lits = inputs + (out,)
+            for row in template:
+                self.clauses.append([sign * lit for sign, lit in zip(row, lits) if sign])
+            self.gates[key] = out
+        return self.gates[key]
+
+    def and_gate(self, a, b):
+        if a == -self.true or b == -self.true or a == -b:
+            return -self.true
+        if a == self.true or a == b:
+            return b
+        if b == self.true:
+            return a
+        return self.gate(AND_GATE, a, b)
+
+    def or_gate(self, a, b):
+        return -self.and_gate(-a, -b)
+
+    def xor_gate(self, *inputs):
+        """
+        XOR of two or three literals. Negated inputs and true are moved to the output,
+        and an input that appears twice cancels out.
+        """
+        sign = 1
+        lits = []
+        for lit in inputs:
+            if lit < 0:
+                sign, lit = -sign, -lit
+            if lit == self.true:
+                sign = -sign
+            elif lit in lits:
+                lits.remove(lit)
+            else:
+                lits.append(lit)
+        if not lits:
+            return -sign * self.true
+        if len(lits) == 1:
+            return sign * lits[0]
+        return sign * self.gate(XOR_GATE if len(lits) == 2 else SUM_GATE, *lits)
+
+    def carry_gate(self, a, b, c):
+        """ Majority of three literals. """
+        for x, y, z in ((a, b, c), (b, c, a), (c, a, b)):
+            if x == self.true:
+                return self.or_gate(y, z)
+            if x == -self.true:
+                return self.and_gate(y, z)
+            if x == y:
+                return x
+            if x == -y:
+                return z
+        return self.gate(CARRY_GATE, a, b, c)
+
+    def half_adder(self, a, b, last=False):
+        """ Return the sum and the carry of a + b. There is no carry out of the last bit. """
+        return self.xor_gate(a, b), None if last else self.and_gate(a, b)
+
+    def full_adder(self, a, b, c, last=False):
+        """ Return the sum and the carry of a + b + c. There is no carry out of the last bit. """
+        return self.xor_gate(a, b, c), None if last else self.carry_gate(a, b, c)
+
+    def adder(self, a_bits, b_bits):
+        """ Ripple-carry adder. The carry out of the last bit is dropped. """
+        result_bits = []
+        carry = None  # Carry-in at LSB is always 0
+        for i, (a, b) in enumerate(zip(a_bits, b_bits)):
+            last = i == len(a_bits) - 1
+            if carry is None:
+                bit, carry = self.half_adder(a, b, last)
+            else:
+                bit, carry = self.full_adder(a, b, carry, last)
+            result_bits.append(bit)
+        return result_bits
+
+    def array_multiplier(self, a_bits, b_bits):
+        """
+        Shift-add multiplier: adds the partial products a * b[i], shifted by i, one row
+        at a time. Only the low len(a_bits) bits of the product are kept.
+        """
+        n = len(a_bits)
+        result_bits = [self.and_gate(a, b_bits[0]) for a in a_bits]
+        for i in range(1, n):
+            row = [self.and_gate(a, b_bits[i]) for a in a_bits[:n - i]]
+            result_bits = result_bits[:i] + self.adder(result_bits[i:], row)
+        return result_bits
+
+    def wallace_multiplier(self, a_bits, b_bits):
+        """
+        Wallace tree multiplier: reduces the columns of partial products with full and
+        half adders until every column has at most two bits, then adds the two rows.
+        """
+        n = len(a_bits)
+        columns = [[] for _ in range(n)]  # columns[k]: the bits of weight 2^k
+        for i, b in enumerate(b_bits):
+            for j, a in enumerate(a_bits[:n - i]):
+                columns[i + j].append(self.and_gate(a, b))
 
-    return And(constraints)
+        while any(len(column) > 2 for column in columns):
+            reduced = [[] for _ in range(n)]
+            for k, column in enumerate(columns):
+                last = k == n - 1
+                i = 0
+                while len(column) - i >= 3:
+                    bit, carry = self.full_adder(column[i], column[i + 1], column[i + 2], last)
+                    reduced[k].append(bit)
+                    if carry is not None:
+                        reduced[k + 1].append(carry)
+                    i += 3
+                if len(column) - i == 2 and len(column) > 2:
+                    bit, carry = self.half_adder(column[i], column[i + 1], last)
+                    reduced[k].append(bit)
+                    if carry is not None:
+                        reduced[k + 1].append(carry)
+                    i += 2
+                reduced[k].extend(column[i:])
+            columns = reduced
+
+        # Every column has one or two bits, plus the carry of the previous one
+        result_bits = []
+        carry = None
+        for k, column in enumerate(columns):
+            last = k == n - 1
+            bits = column + ([carry] if carry is not None else [])
+            if len(bits) == 1:
+                bit, carry = bits[0], None
+            elif len(bits) == 2:
+                bit, carry = self.half_adder(bits[0], bits[1], last)
+            else:
+                bit, carry = self.full_adder(bits[0], bits[1], bits[2], last)
+            result_bits.append(bit)
+        return result_bits
+
+    def equality(self, a_bits, b_bits):
+        """ A single literal that is true iff both sides are equal bit by bit. """
+        same = []
+        for a, b in zip(a_bits, b_bits):
+            s = -self.xor_gate(a, b)
+            if s == -self.true:
+                return -self.true
+            if s != self.true and s not in same:
+                same.append(s)
+        if len(same) <= 1:
+            return same[0] if same else self.true
+        eq = self.new_var()
+        self.clauses.append([eq] + [-s for s in same])
+        self.clauses.extend([-eq, s] for s in same)
+        return eq
+
+    def term_bits(self, term, args_bits):
+        """ Emit the clauses of term over the bits of its arguments, and return its bits. """
+        if term.is_symbol():
+            return [self.new_var() for _ in range(term.bv_width())]
+
+        elif term.is_constant():
+            constant_value = term.constant_value()
+            return [self.true if (constant_value >> i) & 1 else -self.true for i in range(term.bv_width())]
+
+        elif term.is_bv_and():
+            return [self.and_gate(a, b) for a, b in zip(*args_bits)]
+
+        elif term.is_bv_or():
+            return [self.or_gate(a, b) for a, b in zip(*args_bits)]
+
+        elif term.is_bv_add():
+            return self.adder(*args_bits)
+
+        elif term.is_bv_mul():
+            if self.multiplier == "wallace":
+                return self.wallace_multiplier(*args_bits)
+            return self.array_multiplier(*args_bits)
+
+        elif term.is_equals():
+            return [self.equality(*args_bits)]
+
+        else:
+            raise NotImplementedError(f"Unsupported operation: {term}")
+
+    def blast(self, term):
+        """ Return the literals of the bits of term, blasting it if it is not cached. """
+        bits = self.blast_term(term)
+        self.touch(term)
+        return bits
+
+    def blast_term(self, term):
+        """
+        blast without touching: blast the terms below term that are not cached, arguments
+        first, and return the bits of term. blast touches them all once at the end.
+        """
+        if term in self.cache:
+            self.hits += 1
+            return self.cache[term][0]
+        stack = [term]
+        while stack:
+            t = stack[-1]
+            if t in self.cache:
+                stack.pop()
+                continue
+            pending = [arg for arg in t.args() if arg not in self.cache]
+            if pending:
+                stack.extend(reversed(pending))  # Left to right, as a recursion would
+                continue
+            stack.pop()
+            self.misses += 1
+            start = len(self.clauses)
+            bits = self.term_bits(t, [self.cache[arg][0] for arg in t.args()])
+            for clause in self.clauses[start:]:
+                self.solver.add_clause(clause)
+            self.cache[t] = (bits, len(self.clauses) - start)
+            self.live_clauses += len(self.clauses) - start
+        return self.cache[term][0]
+
+    def touch(self, term):
+        """
+        Mark term and every term below it as the most recently used, each one before the
+        terms below it: in reverse post-order, since the terms form a DAG.
+        """
+        post_order, seen = [], set()
+        stack = [(term, False)]
+        while stack:
+            t, done = stack.pop()
+            if done:
+                post_order.append(t)
+            elif t not in seen:
+                seen.add(t)
+                stack.append((t, True))
+                stack.extend((arg, False) for arg in t.args())
+        for t in reversed(post_order):
+            self.cache.move_to_end(t)
+
+    def evict(self):
+        """ Drop the least recently used entries beyond max_nodes. """
+        while len(self.cache) > self.max_nodes:
+            _, (_, num_clauses) = self.cache.popitem(last=False)
+            self.live_clauses -= num_clauses
+            self.dead_clauses += num_clauses
+        if self.dead_clauses > self.live_clauses:
+            self.rebuild()
+
+    def rebuild(self):
+        """ Start a new solver with only the live entries, blasting them again. """
+        terms = list(self.cache)
+        hits, misses = self.hits, self.misses
+        self.reset()
+        for term in terms:
+            self.blast_term(term)
+        # Back to the old order, in which arguments are used more recently than their terms
+        for term in terms:
+            self.cache.move_to_end(term)
+        self.hits, self.misses = hits, misses
+
+    def encode(self, cube):
+        """
+        Rewrite and blast the atoms of a cube of equalities and disequalities. A literal
+        symbol = constant of the cube substitutes the constant for the symbol in the
+        other literals first. Returns the solver literal of every literal of the cube,
+        and for every literal of the cube, the literals its rewriting depends on.
+        """
+        substitution = {}  # Symbol -> (constant, the literal it comes from)
+        for lit in cube:
+            if lit.is_equals():
+                a, b = lit.args()
+                if a.is_constant():
+                    a, b = b, a
+                if a.is_symbol() and b.is_constant() and a not in substitution:
+                    substitution[a] = (b, lit)
+
+        assumptions, sources = [], []
+        for lit in cube:
+            atom = lit.arg(0) if lit.is_not() else lit
+            used = [v for v in atom.get_free_variables() if v in substitution and substitution[v][1] != lit]
+            atom = self.rewriter.rewrite(atom.substitute({v: substitution[v][0] for v in used}))
+            if atom.is_true() or atom.is_false():
+                bit = self.true if atom.is_true() else -self.true
+            else:
+                bit = self.blast(atom)[0]
+            assumptions.append(-bit if lit.is_not() else bit)
+            sources.append([lit] + [substitution[v][1] for v in used])
+        return assumptions, sources
+
+    def check(self, cube):
+        """
+        Solve a cube of bit-vector equalities and disequalities. Returns a model of the
+        solver variables, or None; then self.core holds the literals of the cube that the
+        solver found inconsistent together.
+        """
+        self.checked = list(cube)
+        assumptions, sources = self.encode(cube)
+        model = self.solver.solve(assumptions)
+        self.core = None
+        if model is None:
+            core = set(self.solver.core)
+            self.core = []
+            for lits, a in zip(sources, assumptions):
+                if a in core:
+                    self.core.extend(lit for lit in lits if lit not in self.core)
+        self.evict()  # Only now, so that no atom of this cube loses its clauses while in use
+        return model
+
+
+# Shared by all the bv_solver calls of a run
+bv_cache = BitBlaster()
+
+
+def bit_blasting(cube):
+    """
+    Bit-blast a cube of bit-vector equalities and disequalities on its own.
+    Returns the CNF, with a unit clause for every literal of the cube.
+    """
+    blaster = BitBlaster()
+    assumptions, _ = blaster.encode(cube)
+    return blaster.clauses + [[a] for a in assumptions]
 
 
 def bv_solver(formula):
     """
-    1. Apply bit-blasting to convert the formula to a Boolean formula.
-    2. Convert it to CNF using Tseitin transformation.
-    3. Solve it using a CDCL solver.
+    1. Bit-blast the literals of the cube into CNF, reusing the cached encodings of known terms.
+    2. Solve it using the shared incremental CDCL solver, with the literals as assumptions.
     """
     if isinstance(formula, list):
-        formula = And(formula)  # Convert list into a single formula
-    if not is_flat_cube([formula] if formula.is_equals() else formula.args()):
-        formula = flattening(formula)
-    print("after flattening")
-    print(formula)
-    phi = bit_blasting(formula)
-    print("ater bit blasting:")
-    print(phi)
-    cnf, var_to_int, int_to_var = cnf_to_dimacs(tseitin_transformation(phi))
-    solver = CDCLSolver()
-    result = solver.cdcl_solve(cnf)
-    return result
+        cube = formula
+    else:
+        cube = list(formula.args()) if formula.is_and() else [formula]
+    return bv_cache.check(cube)
+
+
+def bv_explain(cube):
+    """
+    Explain why bv_solver rejects the list of theory literals cube: return a minimal
+    subset of it that is already unsatisfiable, to be blocked instead of the whole cube.
+    The search starts from the unsat core of the check, which dpll_t has just run on cube.
+    """
+    if bv_cache.checked != list(cube):
+        bv_cache.check(cube)
+    return minimize_explanation(bv_cache.core, lambda literals: bv_solver(literals) is not None)
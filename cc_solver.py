@@ -1,6 +1,6 @@
 # importing system module for reading files
 import sys
-from tr import flattening
+from tr import minimize_explanation
 
 # import classes for parsing smt2 files
 from pysmt.smtlib.parser import SmtLibParser
@@ -11,7 +11,7 @@ import pysmt.operators as op
 from pysmt.shortcuts import get_env
 
 # import pysmt functions for creating formulas and terms
-from pysmt.shortcuts import Not, EqualsOrIff, Function, And, Symbol, BOOL
+from pysmt.shortcuts import Not, EqualsOrIff, And, Symbol, BOOL, TRUE, FALSE
 
 
 # helper class
@@ -25,28 +25,6 @@ class SubTermsGetter(IdentityDagWalker):
         self.sub_terms.add(formula)
 
 
-# helper class
-class FunctionSymbolsGetter(IdentityDagWalker):
-    def __init__(self, env):
-        IdentityDagWalker.__init__(self, env=env, invalidate_memoization=True)
-        self.funs = set([])
-
-    def walk_function(self, formula, args, **kwargs):
-        function_name = formula.function_name()
-        self.funs.add(function_name)
-
-    @handles(set(op.ALL_TYPES) - set([op.FUNCTION]))
-    def default(self, formula, args, **kwargs):
-        return formula
-
-# get all function symbols in a cube.
-# for example: get_function_symbols([x=y, f(x)=z]) = [f]
-def get_function_symbols(cube):
-  formula = And(cube)
-  function_symbols_getter = FunctionSymbolsGetter(get_env())
-  function_symbols_getter.walk(formula)
-  return function_symbols_getter.funs
-
 # get all terms in a cube.
 # for example: get_terms([x=y, f(x)=z]) = [x, y, z, f(x)]
 def get_terms(cube):
@@ -74,6 +52,10 @@ def is_flat_lit(lit):
         return all(arg.is_symbol() for arg in lit.args()[0].args())
     return False
 
+# check if `term` is an application of a predicate (a Boolean function)
+def is_predicate(term):
+    return term.is_function_application() and term.get_type() == BOOL
+
 # check if `cube` is indeed a cube (that is, a list of literals)
 def is_cube(cube):
   for lit in cube:
@@ -97,98 +79,287 @@ def is_flat_cube(cube):
   return True
 
 
-def get_the_init_configuration_off(flat_cube):
-    sub_term = get_terms(flat_cube)
-    m = set([frozenset([t]) for t in sub_term])
-    f = flat_cube
-    return m, f
-
-def unify(m, X, Y):
-    union = X.union(Y)
-    m.remove(X)
-    m.remove(Y)
-    m.add(frozenset(union))
-    return m
-
-
-def top_level(m, f):
-    for x in m:
-        for y in m:
-            for eq in equalities:
-                left, right = eq.args()
-                if left in x and right in y and x != y:
-                    return unify(m, x, y), f
-    return m, f
-
-def congruence(m, f):
-    function_symbol = get_function_symbols(f)
-    for z in m:
-        for z1 in z:
-            for z2 in z:
-                for fn in function_symbol:
-                    f_z1 = Function(fn, [z1])
-                    f_z2 = Function(fn, [z2])
-                    x = [x for x in m if f_z1 in x]
-                    y = [x for x in m if f_z2 in x]
-                    if x and y and x != y:
-                        return unify(m, x[0], y[0]), f
-    return m, f
-
-def fail(m, f):
-    for x in m:
-        for eq in distincts:
-            left, right = eq.args()[0].args()
-            if left in x and right in x:
-                return None, None
-    return m, f
-
-
-def uf_solver(flat_cube):
-    print("\nOriginal Formula:", flat_cube)
-
-    # flat_cube = flattening(cube)
-    step = 0
-
-    m, f = get_the_init_configuration_off(flat_cube)
-    print(m)
-    print(f)
-    pre_m, pre_f = set([]), []
-    init_equalities(flat_cube)
-
-    while (pre_m, pre_f) != (m, f):
-        # print("******************************")
-        # print("step: ", step)
-        # print("m: ", m)
-        # print("f: ", f)
-        # print()
-        step += 1
-        if m is None or f is None:
-            return m
-
-        pre_m = m.copy()
-        pre_f = f
-
-        m, f = top_level(m, f)
-        if (pre_m, pre_f) != (m, f):
-            continue
-
-        m, f = congruence(m, f)
-        if (pre_m, pre_f) != (m, f):
-            continue
-
-        m, f = fail(m, f)
-        if (pre_m, pre_f) != (m, f):
-            continue
-    return m
-
-# global list of all equalities and distincts
-equalities = []
-distincts = []
-
-def init_equalities(cube):
-    global equalities, distincts
-    for l in cube:
-        if l.is_equals():
-            equalities += [l]
-        elif l.is_not() and l.args()[0].is_equals():
-            distincts += [l]
+# Old value of a key that was not in the table, see CongruenceClosure.set
+MISSING = object()
+
+
+class CongruenceClosure:
+    """
+    Incremental and backtrackable congruence closure, in the style of Downey-Sethi-Tarjan
+    and Nieuwenhuis-Oliveras. The classes are a union-find forest with union by rank.
+    Every class keeps a use list of the function applications that have an argument in
+    it, and the signature table maps (function, classes of the arguments) to an
+    application. When two classes merge, only the applications in the use list of the
+    class that goes under the other get a new signature, and two applications with the
+    same signature are merged in turn, so each merge costs O(n log n) overall.
+
+    Literals are asserted one at a time with assert_literal. Every change to the tables
+    is recorded on an undo trail: push marks a level and pop undoes everything since the
+    matching push. There is no path compression, since it could not be undone cheaply.
+
+    Applications of any arity are handled alike, since a signature holds the classes of
+    all the arguments. A predicate literal p(x) or !p(x) merges the application with the
+    constant TRUE or FALSE, which are distinct, so predicates take part in congruence too.
+
+    A proof forest records why terms are equal: an edge between the two terms of every
+    merge, labelled with the asserted equality or the pair of congruent applications
+    that caused it. explain walks it to find the asserted equalities behind a = b.
+    """
+
+    def __init__(self):
+        self.parent = {}
+        self.rank = {}
+        self.use = {}  # Representative -> the applications with an argument in its class
+        self.signatures = {}  # (function, representatives of the arguments) -> application
+        self.proof = {}  # Term -> (next term towards the root of its proof tree, reason), None at the root
+        self.disequalities = []  # (left, right, literal) of the asserted disequalities
+        self.trail = []  # A function that undoes each change, the latest last
+        self.levels = []  # The length of the trail at every push
+        self.add_term(TRUE())
+        self.add_term(FALSE())
+        self.disequalities.append((TRUE(), FALSE(), None))  # Holds without any literal
+
+    def set(self, table, key, value):
+        """ table[key] = value, undone on pop. """
+        old = table.get(key, MISSING)
+
+        def undo():
+            if old is MISSING:
+                del table[key]
+            else:
+                table[key] = old
+
+        self.trail.append(undo)
+        table[key] = value
+
+    def append(self, lst, item):
+        """ lst.append(item), undone on pop. """
+        lst.append(item)
+        self.trail.append(lst.pop)
+
+    def push(self):
+        self.levels.append(len(self.trail))
+
+    def pop(self):
+        length = self.levels.pop()
+        while len(self.trail) > length:
+            self.trail.pop()()
+
+    def add_term(self, term):
+        """ Add term, and the terms below it, as singleton classes, merging congruent applications. """
+        if term in self.parent:
+            return
+        for arg in term.args():
+            self.add_term(arg)
+        self.set(self.parent, term, term)
+        self.set(self.rank, term, 0)
+        self.set(self.use, term, [])
+        self.set(self.proof, term, None)
+        if term.is_function_application():
+            for rep in set(self.find(arg) for arg in term.args()):
+                self.append(self.use[rep], term)
+            signature = self.signature(term)
+            if signature in self.signatures:
+                self.merge(term, self.signatures[signature], (term, self.signatures[signature]))
+            else:
+                self.set(self.signatures, signature, term)
+
+    def find(self, term):
+        while self.parent[term] != term:
+            term = self.parent[term]
+        return term
+
+    def signature(self, application):
+        return application.function_name(), tuple(self.find(arg) for arg in application.args())
+
+    def merge(self, a, b, reason):
+        """
+        Merge the classes of a and b, because of reason: an equality literal, or a pair of
+        congruent applications. Then merge every pair of applications that became congruent.
+        """
+        pending = [(a, b, reason)]
+        while pending:
+            a, b, reason = pending.pop()
+            ra, rb = self.find(a), self.find(b)
+            if ra == rb:
+                continue
+            self.add_proof_edge(a, b, reason)
+            if self.rank[ra] < self.rank[rb]:
+                ra, rb = rb, ra
+            # rb goes under ra
+            self.set(self.parent, rb, ra)
+            if self.rank[ra] == self.rank[rb]:
+                self.set(self.rank, ra, self.rank[ra] + 1)
+            for application in self.use[rb]:
+                signature = self.signature(application)
+                other = self.signatures.get(signature)
+                if other is not None and other != application:
+                    pending.append((application, other, (application, other)))
+                else:
+                    self.set(self.signatures, signature, application)
+                    self.append(self.use[ra], application)
+
+    def add_proof_edge(self, a, b, reason):
+        """ Make a the root of its proof tree by reversing the path to it, then link a to b. """
+        path = [a]
+        while self.proof[path[-1]] is not None:
+            path.append(self.proof[path[-1]][0])
+        edges = [self.proof[node] for node in path]
+        for i in range(len(path) - 1, 0, -1):
+            self.set(self.proof, path[i], (path[i - 1], edges[i - 1][1]))
+        self.set(self.proof, a, (b, reason))
+
+    def explain(self, a, b):
+        """ The asserted equality literals that imply a = b, for two terms of one class. """
+        literals = []
+        pending, seen = [(a, b)], set()
+        while pending:
+            a, b = pending.pop()
+            if a == b or (a, b) in seen:
+                continue
+            seen.add((a, b))
+            # The paths from a and from b up to their nearest common ancestor
+            path_a = [a]
+            while self.proof[path_a[-1]] is not None:
+                path_a.append(self.proof[path_a[-1]][0])
+            on_path_a = set(path_a)
+            path_b = [b]
+            while path_b[-1] not in on_path_a:
+                path_b.append(self.proof[path_b[-1]][0])
+            common = path_b.pop()
+            for node in path_a[:path_a.index(common)] + path_b:
+                reason = self.proof[node][1]
+                if isinstance(reason, tuple):  # Congruence: explain the arguments pairwise
+                    pending.extend(zip(reason[0].args(), reason[1].args()))
+                elif reason not in literals:
+                    literals.append(reason)
+        return literals
+
+    def assert_literal(self, lit):
+        """
+        Assert an equality, a disequality or a predicate literal, whose terms need not be
+        flat. Returns None if the asserted literals are still consistent. Otherwise returns
+        the literals, lit among them, that are inconsistent together; the caller is
+        expected to pop the level of lit.
+        """
+        atom = lit.arg(0) if lit.is_not() else lit
+        if is_predicate(atom):
+            # p(x) is p(x) = TRUE, and !p(x) is p(x) = FALSE
+            self.add_term(atom)
+            self.merge(atom, FALSE() if lit.is_not() else TRUE(), lit)
+        elif atom.is_equals():
+            left, right = atom.args()
+            self.add_term(left)
+            self.add_term(right)
+            if lit.is_not():
+                if self.find(left) == self.find(right):
+                    return self.explain(left, right) + [lit]
+                self.append(self.disequalities, (left, right, lit))
+                return None
+            self.merge(left, right, lit)
+        else:
+            return None
+        for l, r, disequality in self.disequalities:
+            if self.find(l) == self.find(r):
+                return self.explain(l, r) + ([disequality] if disequality is not None else [])
+        return None
+
+    def classes(self):
+        classes = {}
+        for term in self.parent:
+            classes.setdefault(self.find(term), []).append(term)
+        return set(frozenset(terms) for terms in classes.values())
+
+
+def uf_solver(cube):
+    """
+    Run congruence closure on a cube; its terms need not be flat. Returns the equivalence
+    classes of its terms, or None if a disequality of the cube has both sides in one class.
+    """
+    cc = CongruenceClosure()
+    for term in get_terms(cube):
+        cc.add_term(term)
+    for lit in cube:
+        if cc.assert_literal(lit) is not None:
+            return None
+    return cc.classes()
+
+
+def cc_solver(cube):
+    """
+    Run uf_solver on the list of theory literals cube.
+    Returns the equivalence classes, or None if the cube is unsatisfiable.
+    """
+    return uf_solver(list(cube))
+
+def cc_explain(cube):
+    """
+    Explain why cc_solver rejects the cube: return a minimal subset of it
+    that is already unsatisfiable. The search starts from the literals that
+    the proof forest blames for the first conflict.
+    """
+    cc = CongruenceClosure()
+    for lit in cube:
+        conflict = cc.assert_literal(lit)
+        if conflict is not None:
+            cube = conflict
+            break
+    return minimize_explanation(cube, lambda literals: cc_solver(literals) is not None)
+
+def cc_propagator(int_to_var, tr_minus_one, tr, var_to_int):
+    """
+    Theory callback for CDCLSolver (see theory_propagate) that keeps one CongruenceClosure
+    in step with the theory atoms on the trail. Each call pops the levels of the literals
+    the solver has backtracked over, and asserts the new ones, each on a level of its own.
+    A conflict is returned as the negation of its explanation. Otherwise every unassigned
+    equality atom whose two sides are in one class is propagated, and so is every
+    unassigned predicate atom in the class of TRUE or FALSE, with the explanation of
+    that equality as reason.
+    """
+    cc = CongruenceClosure()
+    for atom in tr_minus_one.values():
+        # At the bottom level, so that congruences between atoms are found
+        for term in [atom] if is_predicate(atom) else atom.args():
+            cc.add_term(term)
+    theory_lit = {}  # Solver literal of a theory atom -> the pysmt literal, and back
+    for var, atom in tr_minus_one.items():
+        if var in var_to_int:
+            theory_lit[var_to_int[var]], theory_lit[-var_to_int[var]] = atom, Not(atom)
+            theory_lit[atom], theory_lit[Not(atom)] = var_to_int[var], -var_to_int[var]
+    asserted = []  # The solver literals asserted in cc, one level each
+
+    def propagate(m):
+        theory_lits = [lit for lit in m if lit in theory_lit]
+        common = 0
+        while common < min(len(asserted), len(theory_lits)) and asserted[common] == theory_lits[common]:
+            common += 1
+        if common == len(asserted) == len(theory_lits):
+            return []
+        while len(asserted) > common:
+            cc.pop()
+            asserted.pop()
+
+        for lit in theory_lits[common:]:
+            cc.push()
+            conflict = cc.assert_literal(theory_lit[lit])
+            if conflict is not None:
+                cc.pop()
+                return [[-theory_lit[l] for l in conflict]]
+            asserted.append(lit)
+
+        assigned = {abs(lit) for lit in m}
+        lemmas = []
+        for var, atom in tr_minus_one.items():
+            if var not in var_to_int or var_to_int[var] in assigned:
+                continue
+            if atom.is_equals():
+                left, right = atom.args()
+                if cc.find(left) == cc.find(right):
+                    lemmas.append([-theory_lit[l] for l in cc.explain(left, right)] + [var_to_int[var]])
+            elif is_predicate(atom):
+                for value, lit in ((TRUE(), var_to_int[var]), (FALSE(), -var_to_int[var])):
+                    if cc.find(atom) == cc.find(value):
+                        lemmas.append([-theory_lit[l] for l in cc.explain(atom, value)] + [lit])
+        return lemmas
+
+    return propagate
@@ -1,174 +1,553 @@
-class CDCLSolver:
-    def __init__(self):
-        self.learn_clauses = []  # Local storage instead of a global variable
-        self.lit_counter = {}  # Local storage instead of a global variable
+class VarHeap:
+    """
+    Binary max-heap of variables ordered by activity. pos[var] is the index of var in
+    the heap (-1 when absent), so a bumped variable is sifted up in O(log n).
+    """
+
+    def __init__(self, activity):
+        self.activity = activity
+        self.heap = []
+        self.pos = [-1] * len(activity)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, var):
+        return self.pos[var] >= 0
+
+    def push(self, var):
+        if self.pos[var] < 0:
+            self.heap.append(var)
+            self.sift_up(len(self.heap) - 1)
+
+    def pop(self):
+        """ Remove and return the variable with the highest activity. """
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        self.pos[top] = -1
+        if heap:
+            heap[0] = last
+            self.sift_down(0)
+        return top
+
+    def increase(self, var):
+        """ Restore the heap order after the activity of var went up. """
+        if self.pos[var] >= 0:
+            self.sift_up(self.pos[var])
+
+    def sift_up(self, i):
+        heap, pos, activity = self.heap, self.pos, self.activity
+        var = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if activity[heap[parent]] >= activity[var]:
+                break
+            heap[i] = heap[parent]
+            pos[heap[i]] = i
+            i = parent
+        heap[i] = var
+        pos[var] = i
+
+    def sift_down(self, i):
+        heap, pos, activity = self.heap, self.pos, self.activity
+        var = heap[i]
+        while True:
+            child = 2 * i + 1
+            if child >= len(heap):
+                break
+            if child + 1 < len(heap) and activity[heap[child + 1]] > activity[heap[child]]:
+                child += 1
+            if activity[heap[child]] <= activity[var]:
+                break
+            heap[i] = heap[child]
+            pos[heap[i]] = i
+            i = child
+        heap[i] = var
+        pos[var] = i
+
+
+class SolverState:
+    """
+    The mutable configuration (m, f, d, k) the CDCL rules work on.
+    m is the trail, f the clauses of the formula, d the decision literals (d[i] opens
+    level i + 1) and k the conflict clause (None while there is no conflict). Learned
+    clauses are kept apart from f, in learnts. The rules update the state in place, so
+    the solver never has to copy or compare it to find out whether a rule fired.
+    The state outlives a single solve: clauses can be added between calls.
+    """
+
+    def __init__(self, f=()):
+        self.m = []
+        self.f = []
+        self.d = []
+        self.k = None
+        self.backjump_level = None  # Set once k has been explained down to its first UIP
+        self.k_id = None  # Set once k has been learned
+        self.failed = False
+        self.unsat = False  # Set once a conflict at level 0 shows the clauses are unsatisfiable
+        self.assumptions = []  # Literals decided before any other, in this order
+        self.failed_assumption = None  # Assumption found false when its turn to be decided came
+
+        self.learnts = {}  # Learned clause store: id -> clause (unit clauses are asserted at level 0)
+        self.lbd = {}  # id -> literal block distance of the learned clause
+        self.next_id = 1
+
+        self.values = [0]  # values[var]: 1 if true, -1 if false, 0 if unassigned
+        self.trail_pos = [0]  # trail_pos[var]: index of the var's literal in m
+        self.level = [0]  # level[var]: decision level the var was assigned at
+        self.reason = [None]  # reason[var]: clause that implied the var, None for decisions
+        self.trail_lim = []  # trail_lim[i]: index in m where decision level i + 1 starts
+        self.watches = {}  # lit -> clauses currently watching lit
+        self.qhead = 0  # Index in m of the next literal to propagate
+        self.conflict_clause = None  # Clause falsified by the last propagation
 
-    def init_lit_counter(self, f):
-        """ Initialize literal counters based on the formula. """
-        self.lit_counter = {}  # Reset counter for each new formula
+        self.activity = [0.0]
+        self.phase = [1]
+        self.var_inc = 1.0
+        self.order = VarHeap(self.activity)
+
+        # VSIDS: activity[var] starts as the occurrence count of its most frequent literal,
+        # and phase[var] as the sign of that literal. Later decisions reuse the saved phase.
+        counter = {}
         for clause in f:
             for l in clause:
-                self.lit_counter[l] = self.lit_counter.get(l, 0) + 1
+                counter[l] = counter.get(l, 0) + 1
+        self.grow(max((abs(l) for l in counter), default=0))
+        for var in range(1, len(self.values)):
+            pos, neg = counter.get(var, 0), counter.get(-var, 0)
+            self.activity[var] = float(max(pos, neg))
+            self.phase[var] = 1 if pos >= neg else -1
+        for clause in f:
+            self.add_clause(clause)
+
+    def grow(self, num_vars):
+        """ Make room for the variables up to num_vars. """
+        for _ in range(len(self.values), num_vars + 1):
+            self.values.append(0)
+            self.trail_pos.append(0)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.phase.append(1)
+            self.order.pos.append(-1)
+
+    def add_clause(self, clause):
+        """
+        Add a clause of the formula at decision level 0. A clause that is unit under the
+        level-0 assignments is propagated right away, and a falsified one makes the state unsat.
+        """
+        clause = list(dict.fromkeys(clause))  # Watches need distinct literals
+        self.backtrack(0)
+        self.grow(max((abs(l) for l in clause), default=0))
+        self.f.append(clause)
+        for l in clause:
+            if self.values[abs(l)] == 0:
+                self.order.push(abs(l))
+
+        self.watch_clause(clause)
+        if len(clause) == 0 or self.value(clause[0]) < 0:
+            self.unsat = True
+        elif self.value(clause[0]) == 0 and (len(clause) == 1 or self.value(clause[1]) < 0):
+            self.assign(clause[0], clause)
+
+    def store_learnt(self, clause):
+        """ Watch a learned clause and keep it in the store under a fresh id, which is returned. """
+        cid = self.next_id
+        self.next_id += 1
+        self.watch_clause(clause)
+        if len(clause) > 1:
+            self.learnts[cid] = clause
+            self.lbd[cid] = len({self.level[abs(lit)] for lit in clause})
+        return cid
+
+    def watch_clause(self, clause):
+        """
+        Watch the first two literals of the clause. The clause is reordered so that
+        they are true or unassigned literals, or else the most recently falsified ones.
+        Clauses with less than two literals are never watched.
+        """
+        if len(clause) < 2:
+            return
+        clause.sort(key=self.watch_rank, reverse=True)
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+
+    def watch_rank(self, lit):
+        """ True literals first, then unassigned ones, then false ones by trail position. """
+        if self.value(lit) >= 0:
+            return len(self.values) + self.value(lit)
+        return self.trail_pos[abs(lit)]
+
+    def value(self, lit):
+        """ 1 if lit is true, -1 if it is false and 0 if it is unassigned. """
+        v = self.values[abs(lit)]
+        return v if lit > 0 else -v
+
+    def assign(self, lit, reason=None):
+        var = abs(lit)
+        self.values[var] = 1 if lit > 0 else -1
+        self.trail_pos[var] = len(self.m)
+        self.level[var] = len(self.d)
+        self.reason[var] = reason
+        self.m.append(lit)
+
+    def new_level(self, lit):
+        """ Open a decision level for lit, without assigning it. """
+        self.d.append(lit)
+        self.trail_lim.append(len(self.m))
+
+    def backtrack(self, level):
+        """
+        Undo all the assignments made above the given decision level. The undone
+        variables keep their value as saved phase and go back into the VSIDS heap.
+        """
+        if len(self.d) > level:
+            n = self.trail_lim[level]
+            for lit in self.m[n:]:
+                var = abs(lit)
+                self.phase[var] = self.values[var]
+                self.values[var] = 0
+                self.order.push(var)
+            del self.m[n:]
+            del self.trail_lim[level:]
+            del self.d[level:]
+            self.qhead = min(self.qhead, n)
+        self.conflict_clause = None
+
+
+class CDCLSolver:
+    def __init__(self, cnf=(), var_decay=0.95, max_learnts=2000, theory=None):
+        self.state = SolverState(cnf)  # Kept across solve calls, see add_clause
+        self.theory = theory  # Callback from the trail to a list of theory lemmas, see theory_propagate
+        self.core = None  # After an unsat solve: the assumptions that caused it
+        self.var_decay = var_decay  # The bump amount grows by 1 / var_decay after every conflict
+        self.max_learnts = max_learnts  # forget reduces the learned clause store above this size
+        self.num_conflict = 0
+        self.steps = 0  # Number of iterations of the rule loop, for benchmarking
+        # Learned clause counters, to tune max_learnts against memory
+        self.num_learned = 0
+        self.num_deleted = 0
+        self.num_kept = 0  # Size of the store when the last solve ended
+
+    def bump(self, s, var):
+        """ Raise the activity of var, rescaling all activities before they overflow. """
+        s.activity[var] += s.var_inc
+        if s.activity[var] > 1e100:
+            for v in range(len(s.activity)):
+                s.activity[v] *= 1e-100
+            s.var_inc *= 1e-100
+        s.order.increase(var)
 
     def cdcl_solve(self, cnf):
         """
         Performs CDCL (Conflict-Driven Clause Learning) to determine SAT or UNSAT.
+        Starts over from the given clauses, forgetting everything from earlier calls.
         """
-        self.init_lit_counter(cnf)
+        self.state = SolverState(cnf)
+        return self.solve()
 
-        m, f, d, k = [], cnf, [], "no"
-        pre_m, pre_f, pre_d, pre_k = [], [], [], []
-        num_conflict = 0
+    def add_clause(self, clause):
+        """ Add a clause to the formula, keeping the learned clauses and the activities. """
+        self.state.add_clause(clause)
 
-        while (pre_m, pre_f, pre_d, pre_k) != (m, f, d, k):
-            pre_m = m.copy()
-            pre_f = f.copy()
-            pre_d = d.copy()
-            pre_k = k if k != "no" else "no"
+    def solve(self, assumptions=()):
+        """
+        Solve the clauses added so far, with the assumption literals decided first.
+        Returns a model as a list of literals, or None if there is none. In that case
+        self.core is the subset of the assumptions that cannot hold together with the
+        clauses (empty when the clauses alone are unsatisfiable).
+        Every rule returns True iff it changed the state; the loop stops when none does.
+        """
+        s = self.state
+        self.core = None
+        if s.unsat:
+            self.core = []
+            return None
+        s.backtrack(0)
+        s.k = s.backjump_level = s.k_id = s.failed_assumption = None
+        s.failed = False
+        s.assumptions = list(assumptions)
+        s.grow(max((abs(l) for l in s.assumptions), default=0))
+        self.num_conflict = 0
 
-            m, f, d, k = self.fail(m, f, d, k)
-            if (pre_m, pre_f, pre_d, pre_k) != (m, f, d, k):
-                break
+        while True:
+            self.steps += 1
 
-            if num_conflict > 700:  # Restart heuristic
-                m, f, d, k = self.restart(m, f, d, k)
-                if (pre_m, pre_f, pre_d, pre_k) != (m, f, d, k):
-                    num_conflict = 0
-                    continue
+            if self.fail(s):
+                break
 
-            m, f, d, k = self.conflict(m, f, d, k)
-            if (pre_m, pre_f, pre_d, pre_k) != (m, f, d, k):
-                num_conflict += 1
-                # Increase counter for literals involved in the conflict
-                for lit in k:
-                    self.lit_counter[lit] += 1
-                # Decay scores periodically
-                if num_conflict % 256 == 0:
-                    for lit in self.lit_counter:
-                        self.lit_counter[lit] //= 2
+            if self.num_conflict > 700 and self.restart(s):  # Restart heuristic
+                self.num_conflict = 0
                 continue
 
-            m, f, d, k = self.explain(m, f, d, k)
-            if (pre_m, pre_f, pre_d, pre_k) != (m, f, d, k):
+            if self.conflict(s):
+                self.num_conflict += 1
                 continue
 
-            m, f, d, k = self.unit_propagate(m, f, d, k)
-            if (pre_m, pre_f, pre_d, pre_k) != (m, f, d, k):
+            if self.explain(s) or self.unit_propagate(s) or self.theory_propagate(s) or self.learn(s) \
+                    or self.forget(s) or self.decide(s) or self.backjump(s):
                 continue
+            break
 
-            m, f, d, k = self.learn(m, f, d, k)
-            if (pre_m, pre_f, pre_d, pre_k) != (m, f, d, k):
-                continue
+        self.num_kept = len(s.learnts)
+        return None if s.failed else list(s.m)
 
-            m, f, d, k = self.decide(m, f, d, k)
-            if (pre_m, pre_f, pre_d, pre_k) != (m, f, d, k):
-                continue
+    def restart(self, s):
+        if not s.d and s.k is None:
+            return False
+        s.backtrack(0)
+        s.k = s.backjump_level = s.k_id = None
+        return True
 
-            m, f, d, k = self.backjump(m, f, d, k)
-            if (pre_m, pre_f, pre_d, pre_k) != (m, f, d, k):
-                continue
+    def learn(self, s):
+        """ Store the explained k under a fresh id, with its LBD: the number of distinct levels in it. """
+        if s.backjump_level is None or s.k_id is not None:
+            return False
 
-            m, f, d, k = self.forget(m, f, d, k)
-            if (pre_m, pre_f, pre_d, pre_k) != (m, f, d, k):
-                continue
+        s.k_id = s.store_learnt(s.k)
+        self.num_learned += 1
+        return True
 
-        return None if k is None else (m if k == "no" else None)
+    def theory_propagate(self, s):
+        """
+        Once unit propagation is done, hand the trail m to the theory callback. It returns
+        lemmas: clauses that hold in the theory, typically the negation of some asserted
+        literals, plus an implied literal for a propagation. The lemmas are learned; a false
+        one is a theory conflict, raised at the level of its latest literal, and a unit one
+        propagates its literal.
+        """
+        if self.theory is None or s.k is not None or s.conflict_clause is not None:
+            return False
 
-    def restart(self, m, f, d, k):
-        return [], f, [], "no"
+        changed = False
+        for lemma in self.theory(s.m):
+            lemma = list(dict.fromkeys(lemma))
+            # A lemma can mention theory atoms that no clause of the formula has (any longer)
+            s.grow(max((abs(l) for l in lemma), default=0))
+            for l in lemma:
+                if s.values[abs(l)] == 0:
+                    s.order.push(abs(l))
+            if len(lemma) < 2:  # A unit lemma holds for good, it is asserted at level 0
+                if lemma and s.value(lemma[0]) > 0 and s.level[abs(lemma[0])] == 0:
+                    continue
+                s.backtrack(0)
+                if lemma and s.value(lemma[0]) == 0:
+                    s.assign(lemma[0], lemma)
+                else:
+                    s.conflict_clause = lemma
+                return True
+            s.store_learnt(lemma)
+            self.num_learned += 1
+            if s.value(lemma[0]) < 0:
+                s.backtrack(s.level[abs(lemma[0])])
+                s.conflict_clause = lemma
+                return True
+            if s.value(lemma[0]) == 0 and s.value(lemma[1]) < 0:
+                s.assign(lemma[0], lemma)
+                changed = True
+        return changed
+
+    def forget(self, s):
+        """
+        When the store holds more than max_learnts clauses, keep the better half, that is
+        the clauses with the lowest LBD (the newest on ties), and delete the others unless
+        they are the reason of a current assignment. The limit then grows by 10%, so that
+        restarts cannot cycle forever over the same clauses.
+        """
+        if s.k is not None or len(s.learnts) <= self.max_learnts:
+            return False
 
-    def learn(self, m, f, d, k):
-        if k != "no" and k not in f and k not in self.learn_clauses:
-            self.learn_clauses.append(k)
-            return m, f + [k], d, "no"
-        return m, f, d, k
+        ranked = sorted(s.learnts, key=lambda cid: (s.lbd[cid], -cid))
+        deleted = set()
+        for cid in ranked[len(ranked) // 2:]:
+            clause = s.learnts[cid]
+            if s.reason[abs(clause[0])] is clause and s.value(clause[0]) > 0:
+                continue
+            del s.learnts[cid]
+            del s.lbd[cid]
+            deleted.add(id(clause))
+        if deleted:
+            for watchers in s.watches.values():
+                watchers[:] = [c for c in watchers if id(c) not in deleted]
+        self.num_deleted += len(deleted)
+        self.max_learnts = int(self.max_learnts * 1.1)
+        return len(deleted) > 0
 
-    def forget(self, m, f, d, k):
-        if k == "no":
-            for c in self.learn_clauses:
-                if c in f:
-                    f_minus_c = [x for x in f if x not in c]
-                    return m, f_minus_c, d, k
-        return m, f, d, k
+    def conflict(self, s):
+        if s.k is None and s.conflict_clause is not None:
+            s.k = s.conflict_clause
+            return True
+        return False
 
-    def conflict(self, m, f, d, k):
-        if k != "no":
-            return m, f, d, k
-        for clause in f:
-            if self.model_conflict(m, [clause]):
-                return m, f, d, clause
-        return m, f, d, k
-
-    def explain(self, m, f, d, k):
-        if k == "no":
-            return m, f, d, k
-        for lit in k:
-            if -lit in m:
-                for clause in [c for c in f if -lit in c]:
-                    c = [l for l in clause if l != -lit]
-                    conflict = self.model_conflict(m[:m.index(-lit)], [c])
-                    if conflict:
-                        new_k = [l for l in list(set(k + c)) if l != lit]
-                        if lit in c:
-                            new_k.append(lit)
-                        if new_k != k:
-                            return m, f, d, new_k
-        return m, f, d, k
-
-    def backjump(self, m, f, d, k):
-        if k == "no" or len(d) == 0:
-            return m, f, d, k
-
-        for l in k:
-            for l0 in d:
-                l0n = m[m.index(l0):]
-                rest_model = m[:m.index(l0)]
-                if all(-lit in rest_model for lit in k if lit != l) and -l in l0n:
-                    return rest_model + [l], f, [lit for lit in d if lit not in l0n], "no"
-        return m, f, d, k
-
-    def unit_propagate(self, m, f, d, k):
-        if m is None and f is None and d is None:
-            return m, f, d, k
+    def explain(self, s):
+        """
+        Resolve k with the reasons of its conflict-level literals, latest first, until a
+        single literal of the conflict level is left (the first UIP). This walks the trail
+        once. The learned k starts with the negated UIP, followed by a literal of the
+        second-highest level, which is where backjump returns to. Every variable met on
+        the way gets its activity bumped, and later bumps grow by 1 / var_decay.
+        """
+        if s.k is None or s.backjump_level is not None:
+            return False
 
-        for clause in f:
+        conflict_level = len(s.d)
+        seen = set()
+        learned = []
+        pending = 0  # Literals of the conflict level still to resolve
+        clause = s.k
+        i = len(s.m) - 1
+        while True:
             for lit in clause:
-                if lit not in m and -lit not in m and lit != 0:
-                    conflict = self.model_conflict(m, [[l for l in clause if l != lit]])
-                    if conflict:
-                        m.append(lit)
-                        return m, f, d, k
-        return m, f, d, k
-
-    def decide(self, m, f, d, k):
-        if m is None and f is None and d is None:
-            return m, f, d
-
-        l = self.choose_lit_vsids(m)
-        if l is None:
-            return m, f, d, k
+                var = abs(lit)
+                if var not in seen and s.level[var] > 0:  # Level-0 literals are false for good
+                    seen.add(var)
+                    self.bump(s, var)
+                    if s.level[var] == conflict_level:
+                        pending += 1
+                    else:
+                        learned.append(lit)
+            while abs(s.m[i]) not in seen:
+                i -= 1
+            uip = s.m[i]
+            i -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = s.reason[abs(uip)]
 
-        d.append(l)
-        m.append(l)
-        return m, f, d, k
+        s.backjump_level = 0
+        for j, lit in enumerate(learned):
+            if s.level[abs(lit)] > s.backjump_level:
+                s.backjump_level = s.level[abs(lit)]
+                learned[0], learned[j] = learned[j], learned[0]
+        s.k = [-uip] + learned
+        # Decay all activities at once by bumping harder after every analyzed conflict
+        s.var_inc /= self.var_decay
+        return True
 
-    def fail(self, m, f, d, k):
-        if len(d) == 0 and k != "no":
-            return None, None, None, None
-        return m, f, d, k
+    def backjump(self, s):
+        if s.backjump_level is None:
+            return False
 
-    def model_conflict(self, m, f):
-        for clause in f:
-            if all(-lit in m for lit in clause):
+        s.backtrack(s.backjump_level)
+        s.assign(s.k[0], s.k)
+        s.k = s.backjump_level = s.k_id = None
+        return True
+
+    def unit_propagate(self, s):
+        """
+        Propagate every literal of m that was not propagated yet, until fixpoint or conflict.
+        Only the clauses watching the negation of a new literal are visited. A falsified
+        clause is kept in s.conflict_clause, the conflict rule turns it into k.
+        """
+        if s.k is not None or s.conflict_clause is not None:
+            return False
+        trail_len = len(s.m)
+
+        m = s.m
+        while s.qhead < len(m):
+            false_lit = -m[s.qhead]
+            s.qhead += 1
+            watchers = s.watches.get(false_lit)
+            if not watchers:
+                continue
+            i = j = 0
+            while i < len(watchers):
+                clause = watchers[i]
+                i += 1
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                other = clause[0]
+                if s.value(other) > 0:
+                    watchers[j] = clause
+                    j += 1
+                    continue
+                # Look for a new literal to watch instead of false_lit
+                for n in range(2, len(clause)):
+                    if s.value(clause[n]) >= 0:
+                        clause[1], clause[n] = clause[n], clause[1]
+                        s.watches.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    watchers[j] = clause
+                    j += 1
+                    if s.value(other) < 0:
+                        s.conflict_clause = clause
+                        while i < len(watchers):
+                            watchers[j] = watchers[i]
+                            i += 1
+                            j += 1
+                    else:
+                        s.assign(other, clause)
+            del watchers[j:]
+            if s.conflict_clause is not None:
                 return True
-        return False
+        return len(m) != trail_len
+
+    def decide(self, s):
+        """
+        The assumptions are decided first, one per level; an assumption that already
+        holds gets an empty level. A false assumption fails the solve.
+        """
+        if s.k is not None or s.conflict_clause is not None:
+            return False
+
+        while len(s.d) < len(s.assumptions):
+            l = s.assumptions[len(s.d)]
+            if s.value(l) < 0:
+                s.failed_assumption = l
+                return True
+            s.new_level(l)
+            if s.value(l) == 0:
+                s.assign(l)
+                return True
+
+        l = self.choose_lit_vsids(s)
+        if l is None:
+            return False
 
-    def choose_lit_vsids(self, m):
-        max_score = 0
-        chosen_lit = None
-        for lit, score in self.lit_counter.items():
-            if lit not in m and -lit not in m:
-                if score > max_score:
-                    max_score = score
-                    chosen_lit = lit
-        return chosen_lit
+        s.new_level(l)
+        s.assign(l)
+        return True
+
+    def fail(self, s):
+        if len(s.d) == 0 and s.k is not None:
+            s.unsat = s.failed = True
+            self.core = []
+        elif s.failed_assumption is not None:
+            s.failed = True
+            self.core = self.analyze_final(s, s.failed_assumption)
+        return s.failed
+
+    def analyze_final(self, s, lit):
+        """
+        The assumptions that force the assumption lit to be false: lit itself, plus the
+        assumptions reached from -lit by walking the trail back through the reasons.
+        """
+        core = [lit]
+        if s.level[abs(lit)] == 0:
+            return core
+        seen = {abs(lit)}
+        for i in range(len(s.m) - 1, s.trail_lim[0] - 1, -1):
+            var = abs(s.m[i])
+            if var not in seen:
+                continue
+            if s.reason[var] is None:  # Only assumptions are decided below the failing one
+                core.append(s.m[i])
+            else:
+                for l in s.reason[var]:
+                    if s.level[abs(l)] > 0:
+                        seen.add(abs(l))
+        return core
+
+    def choose_lit_vsids(self, s):
+        """
+        Pop the most active variable and decide it with its saved phase. Assigned
+        variables are only dropped from the heap here, when they reach the top.
+        """
+        while s.order:
+            var = s.order.pop()
+            if s.values[var] == 0:
+                return var * s.phase[var]
+        return None
@@ -1,9 +1,10 @@
 # importing system module for reading files
 import sys
-from bv_solver import bv_solver
+from bv_solver import bv_solver, bv_explain
+from cc_solver import cc_solver, cc_explain, cc_propagator
 from cdcl_vsids import CDCLSolver
 from tr import get_boolean_skeleton, cnf_to_dimacs, substitute_model, substitute_tr_minus_one, not_phi_model, \
-                substitute_model_minus_one
+                substitute_model_minus_one, is_bv_atoms
 from tseytin import tseitin_transformation
 
 # import classes for parsing smt2 files
@@ -25,14 +26,23 @@ def dpll_t(formula):
 
     cnf, var_to_int, int_to_var = cnf_to_dimacs(tseitin)
     print("cnf: ", cnf)
-    solver = CDCLSolver()
+
+    # Bit-vector formulas are checked by bv_solver once the model is complete. Formulas with
+    # uninterpreted functions go to congruence closure, which also runs on partial models.
+    if is_bv_atoms(tr_minus_one.values()):
+        theory_solver, theory_explain = bv_solver, bv_explain
+        solver = CDCLSolver(cnf)
+    else:
+        theory_solver, theory_explain = cc_solver, cc_explain
+        solver = CDCLSolver(cnf, theory=cc_propagator(int_to_var, tr_minus_one, tr, var_to_int))
     while True:
         print()
         print("***********************************************")
         print("cnf: ", cnf)
 
         # Step 2: Run a SAT solver on the Boolean skeleton to find a propositional model.
-        model = solver.cdcl_solve(cnf)
+        # The solver keeps its learned clauses and activities from the previous iterations.
+        model = solver.solve()
         print("cdcl_solve model: ", model)
         print()
 
@@ -47,7 +57,7 @@ def dpll_t(formula):
         print("substitute_tr_model: ", model)
         print()
 
-        uf_model = bv_solver(model)
+        uf_model = theory_solver(model)
         print("sat" if uf_model is not None else "unsat")
         print()
         # If the theory solver confirms the model is valid under the theory, the formula is satisfiable.
@@ -55,14 +65,16 @@ def dpll_t(formula):
         if uf_model is not None:
             return "sat";
 
-        # Step 4: Refine the formula by adding a clause that excludes negates  the current model.
-        # This forces the SAT solver to find a different propositional model in the next iteration.
-        not_model = not_phi_model(model)
+        # Step 4: Refine the formula by adding a clause that negates the theory explanation:
+        # a minimal subset of the current model that is already inconsistent in the theory.
+        # This excludes the current model, and every other model that contains the explanation.
+        not_model = not_phi_model(theory_explain(model))
         not_model = substitute_tr_minus_one(not_model, tr)
         not_model = substitute_model_minus_one(not_model, var_to_int)
         print("not_model: ", not_model)
         print()
         cnf = cnf + [not_model]
+        solver.add_clause(not_model)
 
 
 # read path from input
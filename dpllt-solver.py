@@ -1,11 +1,14 @@
 # importing system module for reading files
 import sys
 
-from bv_solver import bv_solver
+from ackermann import ackermann_solve
+from bv_solver import bv_solver, bv_explain
+from cc_solver import cc_solver, cc_explain, cc_propagator
 from cdcl_vsids import CDCLSolver
-from tr import get_boolean_skeleton, cnf_to_dimacs, substitute_model, substitute_tr_minus_one, not_phi_model, \
-                substitute_model_minus_one
-from tseytin import tseitin_transformation
+from preprocess import Preprocessor
+from tr import get_boolean_skeleton, substitute_model, substitute_tr_minus_one, not_phi_model, \
+                substitute_model_minus_one, is_bv_atoms
+from tseytin import tseitin_dimacs
 
 # import classes for parsing smt2 files
 from pysmt.smtlib.parser import SmtLibParser
@@ -14,12 +17,22 @@ from six.moves import cStringIO
 def dpll_t(formula):
     # Step 1: Generate the Boolean skeleton of the formula in CNF.
     skelton_boolean, tr, tr_minus_one = get_boolean_skeleton(formula)
-    tseitin = tseitin_transformation(skelton_boolean)
-    cnf, var_to_int, int_to_var = cnf_to_dimacs(tseitin)
-    solver = CDCLSolver()
+    cnf, var_to_int, int_to_var = tseitin_dimacs(skelton_boolean, polarity=True)
+    # The theory atoms stay, the solver and the theory talk about them; auxiliary variables may go
+    cnf = Preprocessor(cnf, frozen=var_to_int.values()).simplify()
+
+    # Bit-vector formulas are checked by bv_solver once the model is complete. Formulas with
+    # uninterpreted functions go to congruence closure, which also runs on partial models.
+    if is_bv_atoms(tr_minus_one.values()):
+        theory_solver, theory_explain = bv_solver, bv_explain
+        solver = CDCLSolver(cnf)
+    else:
+        theory_solver, theory_explain = cc_solver, cc_explain
+        solver = CDCLSolver(cnf, theory=cc_propagator(int_to_var, tr_minus_one, tr, var_to_int))
     while True:
         # Step 2: Run a SAT solver on the Boolean skeleton to find a propositional model.
-        model = solver.cdcl_solve(cnf)
+        # The solver keeps its learned clauses and activities from the previous iterations.
+        model = solver.solve()
 
         # If the SAT solver returns unsat, it means the Boolean skeleton is unsatisfiable.
         # In this case, the entire formula is unsatisfiable, so we return "unsat".
@@ -29,30 +42,42 @@ def dpll_t(formula):
         # Step 3: Check if the propositional model also satisfies the theory part of the formula.
         model = substitute_model(model, int_to_var)
         model = substitute_tr_minus_one(model, tr_minus_one)
-        uf_model = bv_solver(model)
+        uf_model = theory_solver(model)
         # If the theory solver confirms the model is valid under the theory, the formula is satisfiable.
         # Return "sat" to indicate that a satisfying assignment was found.
         if uf_model is not None:
             return "sat";
 
-        # Step 4: Refine the formula by adding a clause that excludes negates  the current model.
-        # This forces the SAT solver to find a different propositional model in the next iteration.
-        not_model = not_phi_model(model)
+        # Step 4: Refine the formula by adding a clause that negates the theory explanation:
+        # a minimal subset of the current model that is already inconsistent in the theory.
+        # This excludes the current model, and every other model that contains the explanation.
+        not_model = not_phi_model(theory_explain(model))
         not_model = substitute_tr_minus_one(not_model, tr)
         not_model = substitute_model_minus_one(not_model, var_to_int)
-        cnf = cnf + [not_model]
+        solver.add_clause(not_model)
 
 
-# read path from input
-path = sys.argv[1]
-with open(path, "r") as f:
-    smtlib = f.read()
+if __name__ == "__main__":
+    # read path from input, and the optional mode for formulas with uninterpreted functions:
+    # "lazy" (default) runs DPLL(T) with congruence closure, "ackermann" reduces the formula
+    # to a single SAT call
+    path = sys.argv[1]
+    mode = sys.argv[2] if len(sys.argv) > 2 else "lazy"
+    if mode not in ("lazy", "ackermann"):
+        raise ValueError(f"Unknown mode: {mode}")
+    with open(path, "r") as f:
+        smtlib = f.read()
 
-    # parse the smtlib file and get a formula
-    parser = SmtLibParser()
-    script = parser.get_script(cStringIO(smtlib))
-    formula = script.get_last_formula()
+        # parse the smtlib file and get a formula
+        parser = SmtLibParser()
+        script = parser.get_script(cStringIO(smtlib))
+        formula = script.get_last_formula()
 
-    print("\nOriginal Formula:", formula)
+        print("\nOriginal Formula:", formula)
 
-    print("sat" if dpll_t(formula) == "sat" else "unsat")
\ No newline at end of file
+        # Ackermannization applies to uninterpreted functions only; bit-vectors always go through DPLL(T)
+        if mode == "ackermann" and not is_bv_atoms(formula.get_atoms()):
+            result = ackermann_solve(formula)
+        else:
+            result = dpll_t(formula)
+        print("sat" if result == "sat" else "unsat")
@@ -0,0 +1,138 @@
+class Preprocessor:
+    """
+    SatELite-style simplification of a CNF before search: backward subsumption,
+    self-subsuming strengthening and bounded variable elimination, over occurrence lists.
+    Frozen variables are never eliminated, so clauses over them (theory lemmas, blocking
+    clauses) can still be added to the simplified CNF. extend_model turns a model of the
+    simplified CNF into a model of the original one.
+    """
+
+    def __init__(self, cnf, frozen=(), max_occurrences=10, max_resolvent=20):
+        self.frozen = set(frozen)
+        self.max_occurrences = max_occurrences  # Variables with more on both sides are not eliminated
+        self.max_resolvent = max_resolvent  # Nor those with a longer resolvent
+        self.clauses = []  # index -> set of literals, None once removed
+        self.occurs = {}  # literal -> indices of the clauses it occurs in
+        self.queue = []  # Clauses to check against the others for subsumption and strengthening
+        self.touched = set()  # Variables whose clauses changed since they were last tried for elimination
+        self.eliminated = []  # (variable, its clauses when it was eliminated), in elimination order
+        self.variables = {abs(l) for clause in cnf for l in clause}  # Those of the original CNF
+        self.unsat = False
+        for clause in cnf:
+            self.add(clause)
+
+    def add(self, clause):
+        clause = set(clause)
+        if any(-l in clause for l in clause):
+            return
+        if not clause:
+            self.unsat = True
+        i = len(self.clauses)
+        self.clauses.append(clause)
+        for l in clause:
+            self.occurs.setdefault(l, set()).add(i)
+            self.occurs.setdefault(-l, set())
+            self.touched.add(abs(l))
+        self.queue.append(i)
+
+    def remove(self, i):
+        for l in self.clauses[i]:
+            self.occurs[l].discard(i)
+            self.touched.add(abs(l))
+        self.clauses[i] = None
+
+    def strengthen(self, i, l):
+        """ Remove literal l from clause i. """
+        self.clauses[i].discard(l)
+        self.occurs[l].discard(i)
+        self.touched.add(abs(l))
+        if not self.clauses[i]:
+            self.unsat = True
+        self.queue.append(i)
+
+    def subsume(self):
+        """
+        Use every queued clause C against the clauses D that share one of its variables:
+        remove D when C is a subset of it, and remove ~p from D when C with p replaced by
+        ~p is (self-subsuming resolution: D is the resolvent of itself and C on p).
+        """
+        while self.queue and not self.unsat:
+            i = self.queue.pop()
+            c = self.clauses[i]
+            if c is None:
+                continue
+            # Every such D contains l or ~l, for the least occurring literal l of C
+            best = min(c, key=lambda l: len(self.occurs[l]) + len(self.occurs[-l]))
+            for j in list(self.occurs[best]) + list(self.occurs[-best]):
+                d = self.clauses[j]
+                if j == i or d is None or len(d) < len(c):
+                    continue
+                flipped = None
+                for l in c:
+                    if l not in d:
+                        if flipped is not None or -l not in d:
+                            break
+                        flipped = l
+                else:
+                    if flipped is None:
+                        self.remove(j)
+                    else:
+                        self.strengthen(j, -flipped)
+
+    def eliminate(self, var):
+        """
+        Replace the clauses of var by all their non-tautological resolvents on var, if
+        there are no more of those than clauses. Returns True iff var was eliminated.
+        """
+        pos, neg = list(self.occurs.get(var, ())), list(self.occurs.get(-var, ()))
+        if not pos and not neg or len(pos) > self.max_occurrences and len(neg) > self.max_occurrences:
+            return False
+        resolvents = []
+        for i in pos:
+            for j in neg:
+                resolvent = (self.clauses[i] | self.clauses[j]) - {var, -var}
+                if any(-l in resolvent for l in resolvent):
+                    continue
+                if len(resolvent) > self.max_resolvent or len(resolvents) == len(pos) + len(neg):
+                    return False
+                resolvents.append(resolvent)
+        self.eliminated.append((var, [sorted(self.clauses[i]) for i in pos + neg]))
+        for i in pos + neg:
+            self.remove(i)
+        for resolvent in resolvents:
+            self.add(resolvent)
+        return True
+
+    def simplify(self):
+        """
+        Subsume, strengthen and eliminate until nothing changes. Returns the simplified
+        clauses, or a single empty clause when the CNF turned out unsatisfiable.
+        """
+        self.subsume()
+        while self.touched and not self.unsat:
+            # The variables with the fewest occurrences first, they are the cheapest to eliminate
+            candidates = sorted((var for var in self.touched if var not in self.frozen),
+                                key=lambda var: (len(self.occurs[var]) + len(self.occurs[-var]), var))
+            self.touched = set()
+            for var in candidates:
+                if self.eliminate(var):
+                    self.subsume()
+                if self.unsat:
+                    break
+        if self.unsat:
+            return [[]]
+        return [sorted(c, key=lambda l: (abs(l), l)) for c in self.clauses if c is not None]
+
+    def extend_model(self, model):
+        """
+        Extend a model of the simplified clauses, as a list of literals, to a literal for every
+        variable of the original CNF. Variables that no clause kept are false; the eliminated
+        ones are set last eliminated first, each false unless one of its clauses needs it true.
+        The resolvents guarantee that its other clauses then still hold.
+        """
+        value = dict.fromkeys(self.variables, False)
+        value.update((abs(l), l > 0) for l in model)
+        for var, clauses in reversed(self.eliminated):
+            value[var] = False
+            value[var] = any(not any(value[abs(l)] == (l > 0) for l in clause) for clause in clauses)
+        return [var if value[var] else -var for var in sorted(value)]
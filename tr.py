@@ -1,4 +1,5 @@
-from pysmt.shortcuts import Symbol, And, Or, Not, Equals, is_sat, Function, Implies, Iff, Or, EqualsOrIff, BOOL
+from pysmt.shortcuts import Symbol, And, Or, Not, Equals, is_sat, Function, Implies, Iff, Or, EqualsOrIff, BOOL, \
+    FreshSymbol
 from pysmt.typing import BOOL, FunctionType, INT
 from pysmt.walkers import IdentityDagWalker
 from pysmt.fnode import FNode
@@ -65,12 +66,9 @@ def cnf_to_dimacs(cnf_formula):
             next_var_id += 1
         return var_to_int[var]
 
-    # Flatten the CNF formula into a list of clauses
-    if not cnf_formula.is_and():  # Ensure the formula is in CNF
-        raise ValueError("Formula must be in Conjunctive Normal Form (CNF).")
-
+    # Flatten the CNF formula into a list of clauses; a formula that is not a conjunction is a single clause
     clauses = []
-    for clause in cnf_formula.args():
+    for clause in (cnf_formula.args() if cnf_formula.is_and() else [cnf_formula]):
         if clause.is_or():  # Each clause is a disjunction of literals
             literals = []
             for lit in clause.args():
@@ -94,6 +92,8 @@ def cnf_to_dimacs(cnf_formula):
 def substitute_model(model, int_to_var):
     literals = []
     for literal in model:
+        if abs(literal) not in int_to_var:  # Auxiliary variable of the CNF encoding
+            continue
         variable = int_to_var[abs(literal)]  # Get the variable from the map
         value = variable if literal > 0 else Not(variable)  # Determine the value based on the sign of the literal
         literals.append(value)
@@ -139,113 +139,82 @@ def not_phi_model(model):
     # Return the conjunction of all literals in the model
     return literals
 
-# flatenning
-def flattening(cube):
-    # cube = [formula]
-    new_cube = []
-    while cube != new_cube:
-        new_cube = cube.copy()
-
-        cube = equal_rule(cube)
-        if cube != new_cube:
-            continue
-
-        cube = not_s_rule(cube)
-        if cube != new_cube:
-            continue
+def is_bv_atoms(atoms):
+    """ Whether any of the theory atoms is over bit-vector terms, ground or not. """
+    return any(arg.get_type().is_bv_type() for atom in atoms for arg in atom.args())
+
+
+def minimize_explanation(cube, is_consistent):
+    """
+    Deletion-based minimization of a theory conflict: drop every literal of the
+    inconsistent cube whose removal leaves the rest inconsistent. What is left is a
+    minimal subset of the cube that the theory solver already rejects.
+    """
+    explanation = list(cube)
+    i = 0
+    while i < len(explanation):
+        rest = explanation[:i] + explanation[i + 1:]
+        if not rest or is_consistent(rest):
+            i += 1
+        else:
+            explanation = rest
+    return explanation
 
-        cube = not_t_rule(cube)
-        if cube != new_cube:
+# flatenning
+def flat_name(term, definitions, names):
+    """
+    Return a symbol equal to term: term itself if it is a symbol, otherwise its fresh
+    symbol x in names. The first time a subterm is named, its definition x = f(y1, ..., yn)
+    over the names of its arguments is added to definitions, after those of its arguments.
+    """
+    stack = [term]
+    while stack:
+        t = stack[-1]
+        if t.is_symbol() or t in names:
+            stack.pop()
             continue
-
-        cube = function_rule(cube)
-        if cube != new_cube:
+        args = t.args() if t.is_function_application() else ()
+        pending = [arg for arg in args if not arg.is_symbol() and arg not in names]
+        if pending:
+            stack.extend(pending)
             continue
+        stack.pop()
+        names[t] = FreshSymbol(t.get_type(), template="x_%d")
+        definition = Function(t.function_name(), [arg if arg.is_symbol() else names[arg] for arg in args]) \
+            if t.is_function_application() else t
+        definitions.append(EqualsOrIff(names[t], definition))
+    return term if term.is_symbol() else names[term]
 
-        cube = predicat_rule(cube)
-        if cube != new_cube:
-            continue
 
-        cube = not_predicat_rule(cube)
-        if cube != new_cube:
-            continue
-        return And(cube)
+def flat_application(term, definitions, names):
+    """ The function application term over the names of its arguments. """
+    return Function(term.function_name(), [flat_name(arg, definitions, names) for arg in term.args()])
 
 
-def equal_rule(cube):
-    for lit in cube:
-        if lit.is_equals():
-            left, right = lit.args()
-            if not left.is_symbol():
-                cube.remove(lit)
-                new_symbol = Symbol(f"x_{left}", left.get_type())
-                cube.extend([EqualsOrIff(new_symbol, right), EqualsOrIff(new_symbol, left)])
-                return cube
-    return cube
-
-def not_s_rule(cube):
-    for lit in cube:
-        if lit.is_not() and lit.args()[0].is_equals():
-            left, right = lit.args()[0].args()
-            if not left.is_symbol():
-                cube.remove(lit)
-                new_symbol = Symbol(f"x_{left}", left.get_type())
-                cube.extend([Not(EqualsOrIff(new_symbol, right)), EqualsOrIff(new_symbol, left)])
-                return cube
-    return cube
-
-def not_t_rule(cube):
-    for lit in cube:
-        if lit.is_not() and lit.args()[0].is_equals():
-            left, right = lit.args()[0].args()
-            if left.is_symbol() and not right.is_symbol():
-                cube.remove(lit)
-                new_symbol = Symbol(f"x_{right}", right.get_type())
-                cube.extend([Not(EqualsOrIff(left, new_symbol)), EqualsOrIff(new_symbol, right)])
-                return cube
-    return cube
-
-def function_rule(cube):
-    for lit in cube:
-        if lit.is_equals():
-            left, right = lit.args()
-            if left.is_symbol() and right.is_function_application():
-                non_symbol = next((arg for arg in right.args() if not arg.is_symbol()), [])
-                if non_symbol != []:
-                    cube.remove(lit)
-                    new_symbol = Symbol(f"x_{non_symbol}", non_symbol.get_type())
-                    new_args = [new_symbol if arg == non_symbol else arg for arg in right.args()]
-                    new_func = Function(right.function_name(), new_args)
-                    cube.extend([EqualsOrIff(left, new_func), EqualsOrIff(new_symbol, non_symbol)])
-                    return cube
-    return cube
-
-def predicat_rule(cube):
-    for lit in cube:
-        if lit.is_function_application() and lit.get_type() == BOOL:
-            non_symbol = next((arg for arg in lit.args() if not arg.is_symbol()), [])
-            if non_symbol != []:
-                cube.remove(lit)
-                new_symbol = Symbol(f"x_{non_symbol}", non_symbol.get_type())
-                new_args = [new_symbol if arg == non_symbol else arg for arg in lit.args()]
-                new_predicat = Function(lit.function_name(), new_args)
-                cube.extend([new_predicat, EqualsOrIff(new_symbol, non_symbol)])
-                return cube
-    return cube
-
-def not_predicat_rule(cube):
+def flattening(cube):
+    """
+    Flatten a cube of equalities, predicates and their negations in one bottom-up pass
+    over the DAG of its terms: every distinct non-symbol subterm gets a fresh symbol and
+    a single flat definition. The result is equisatisfiable with the cube, and its size
+    is linear in the size of the DAG.
+    """
+    # The fresh symbol of every subterm named so far, for this call only
+    definitions, names = [], {}
+    flat = []
     for lit in cube:
-        if lit.is_not() and lit.args()[0].is_function_application() and lit.args()[0].get_type() == BOOL:
-            non_symbol = next((arg for arg in lit.args()[0].args() if not arg.is_symbol()), [])
-            if non_symbol != []:
-                cube.remove(lit)
-                new_symbol = Symbol(f"x_{non_symbol}", non_symbol.get_type())
-                new_args = [new_symbol if arg == non_symbol else arg for arg in lit.args()[0].args()]
-                new_predicat = Function(lit.args()[0].function_name(), new_args)
-                cube.extend([Not(new_predicat), EqualsOrIff(new_symbol, non_symbol)])
-                return cube
-    return cube
-
+        atom = lit.arg(0) if lit.is_not() else lit
+        if atom.is_equals() or atom.is_iff():
+            left, right = atom.args()
+            left = flat_name(left, definitions, names)
+            if lit.is_not():
+                right = flat_name(right, definitions, names)
+            elif right.is_function_application():
+                right = flat_application(right, definitions, names)
+            atom = EqualsOrIff(left, right)
+        elif atom.is_function_application():
+            atom = flat_application(atom, definitions, names)
+        flat.append(Not(atom) if lit.is_not() else atom)
+    return And(flat + definitions)
 
 
 # Example usage
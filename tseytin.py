@@ -1,91 +1,164 @@
 from pysmt.shortcuts import *
 from pysmt.typing import BOOL
 
-def tseitin_transformation(formula):
-    p_c_map = {}
-    clauses = set()
-    i = 1
-
-    def tseitin_subformula(c):
-
-        nonlocal i
-
-        if c in p_c_map:
-            p_c = p_c_map[c]
-        else:
-            p_c = Symbol(f"P_{i}")
-            p_c_map[c] = p_c
-            i += 1
-
+def tseitin_dimacs(formula, polarity=False):
+    """
+    Tseitin transformation straight to DIMACS: return the integer clauses of a CNF
+    equisatisfiable with formula, and the maps between the symbols of formula and their
+    variables. Subformulas become AND and IFF gates over literals: nested conjunctions and
+    disjunctions whose literal is used only once, through any negations, are flattened into
+    one gate, duplicate arguments are dropped, x & ~x and the constants are folded away, and
+    identical gates are shared.
+    Every gate gets an auxiliary variable that is in neither map.
+    With polarity, clauses are added only in the directions a gate occurs in
+    (Plaisted-Greenbaum): x -> gate where it occurs positively, gate -> x where it occurs
+    negatively. The DAG is walked iteratively, arguments left to right, and variables are
+    numbered in the order of their first clause, so the result is the same on every run.
+    """
+    # post-order of the DAG, every subformula after its arguments, and the uses of the literal of each
+    order, uses = [], {}
+    stack = [(formula, False)]
+    while stack:
+        c, expanded = stack.pop()
+        if expanded:
+            order.append(c)
+        elif c not in uses:
+            if not (c.is_symbol() or c.is_bool_constant() or c.is_not() or c.is_and() or c.is_or()
+                    or c.is_implies() or c.is_iff()):
+                raise ValueError(f"Unsupported operator: {c.node_type()}")
+            uses[c] = 0
+            stack.append((c, True))
+            stack.extend((arg, False) for arg in reversed(c.args()))
+    # A Not passes the literal of its argument on, so the uses of a Not are uses of its argument:
+    # a gate is flattened into its parent only if its literal is used once, through any Nots
+    uses[formula] = 1
+    for c in reversed(order):
+        for arg in set(c.args()):
+            uses[arg] += uses[c] if c.is_not() else 1
+
+    num_vars = 1
+    true = 1
+    symbols = {}
+    # gate variable -> ("and", literals) or ("iff", literals)
+    gates = {}
+    # gate -> its variable, and whether a gate may be flattened into the one that uses it
+    keys, single = {}, {}
+
+    def gate(kind, literals, flatten):
+        nonlocal num_vars
+        key = (kind, tuple(sorted(literals)))
+        if key in keys:
+            single[keys[key]] = False
+            return keys[key]
+        num_vars += 1
+        gates[num_vars], keys[key], single[num_vars] = (kind, literals), num_vars, flatten
+        return num_vars
+
+    def and_gate(args, flatten):
+        literals, seen = [], set()
+        for a in args:
+            spliced = gates[a][1] if a > 0 and a in gates and gates[a][0] == "and" and single[a] else [a]
+            for l in spliced:
+                if l == -true or -l in seen:
+                    return -true
+                if l != true and l not in seen:
+                    seen.add(l)
+                    literals.append(l)
+        if not literals:
+            return true
+        if len(literals) == 1:
+            return literals[0]
+        return gate("and", literals, flatten)
+
+    def iff_gate(a, b):
+        if abs(a) == true:
+            return b if a == true else -b
+        if abs(b) == true:
+            return a if b == true else -a
+        if abs(a) == abs(b):
+            return true if a == b else -true
+        # a <-> b is ~a <-> ~b, and ~a <-> b is ~(a <-> b)
+        x = gate("iff", sorted((abs(a), abs(b))), False)
+        return -x if (a < 0) != (b < 0) else x
+
+    literal = {}
+    for c in order:
+        args = [literal[arg] for arg in c.args()]
+        flatten = uses[c] == 1
         if c.is_symbol():
-            clauses.add(Or(Not(p_c), c))
-            clauses.add(Or(Not(c), p_c))
-            return
-
-        if c == Bool(False):
-            clauses.add(Or(Not(p_c), Bool(False)))
-            clauses.add(Or(Bool(True), p_c))
-            return
-        if c == Bool(True):
-            clauses.add(Or(Not(p_c), Bool(True)))
-            clauses.add(Or(Bool(False), p_c))
-            return
-
-        if c.is_and():
-            sub_clauses = c.args()
-            for clause in sub_clauses:
-                tseitin_subformula(clause)
-
-            for clause in sub_clauses:
-                clauses.add(Or(Not(p_c), p_c_map[clause]))
-            clauses.add(Or([p_c] + [Not(p_c_map[cl]) for cl in sub_clauses]))
-
-        elif c.is_or():
-            sub_clauses = c.args()
-            for clause in sub_clauses:
-                tseitin_subformula(clause)
-
-            for clause in sub_clauses:
-                clauses.add(Or(Not(p_c_map[clause]), p_c))
-            clauses.add(Or([Not(p_c)] + [p_c_map[cl] for cl in sub_clauses]))
-
+            num_vars += 1
+            symbols[c] = literal[c] = num_vars
+        elif c.is_bool_constant():
+            literal[c] = true if c.is_true() else -true
         elif c.is_not():
-            d = c.arg(0)
-            tseitin_subformula(d)
-
-            clauses.add(Or(Not(p_c), Not(p_c_map[d])))
-            clauses.add(Or(p_c, p_c_map[d]))
-
+            literal[c] = -args[0]
+        elif c.is_and():
+            literal[c] = and_gate(args, flatten)
+        elif c.is_or():
+            literal[c] = -and_gate([-a for a in args], flatten)
         elif c.is_implies():
-            c1, c2 = c.args()
-            tseitin_subformula(c1)
-            tseitin_subformula(c2)
-
-            pc1, pc2 = p_c_map[c1], p_c_map[c2]
-
-            clauses.add(Or(Not(p_c), Not(pc1), pc2))
-            clauses.add(Or(p_c, pc1))
-            clauses.add(Or(p_c, Not(pc2)))
-
-        elif c.is_iff():
-            c1, c2 = c.args()
-            tseitin_subformula(c1)
-            tseitin_subformula(c2)
-
-            pc1, pc2 = p_c_map[c1], p_c_map[c2]
-
-            clauses.add(Or(Not(p_c), pc1, Not(pc2)))
-            clauses.add(Or(Not(p_c), Not(pc1), pc2))
-            clauses.add(Or(p_c, Not(pc1), Not(pc2)))
-            clauses.add(Or(p_c, pc1, pc2))
-
+            literal[c] = -and_gate([args[0], -args[1]], flatten)
         else:
-            raise ValueError(f"Unsupported operator: {c.node_type()}")
-
-    tseitin_subformula(formula)
-    clauses.add(p_c_map[formula])
-
-    return And(list(clauses))
+            literal[c] = iff_gate(*args)
+
+    # whether each gate occurs positively and negatively; a gate is numbered after its arguments
+    root = literal[formula]
+    if abs(root) in gates and gates[abs(root)][0] == "and":
+        # a conjunction at the top is asserted argument by argument, a disjunction as one clause
+        asserted = [[a] for a in gates[root][1]] if root > 0 else [[-a for a in gates[-root][1]]]
+    else:
+        asserted = [[root]]
+    occurs = {}
+    for l in set(l for clause in asserted for l in clause):
+        occurs[abs(l)] = (True, not polarity) if l > 0 else (not polarity, True)
+    clauses = []
+    for x in range(num_vars, 0, -1):
+        if x not in gates or x not in occurs:
+            continue
+        positive, negative = occurs[x]
+        kind, args = gates[x]
+        for a in args:
+            p, n = (True, True) if kind == "iff" else (positive, negative) if a > 0 else (negative, positive)
+            done_positive, done_negative = occurs.get(abs(a), (False, False))
+            occurs[abs(a)] = (done_positive or p, done_negative or n)
+        if kind == "and":
+            if positive:
+                clauses += [[-x, a] for a in args]
+            if negative:
+                clauses.append([x] + [-a for a in args])
+        else:
+            a, b = args
+            if positive:
+                clauses += [[-x, a, -b], [-x, -a, b]]
+            if negative:
+                clauses += [[x, -a, -b], [x, a, b]]
+    clauses += asserted
+    if abs(root) == true:
+        # the whole formula folded to a constant
+        clauses = [[true]] if root == true else [[true], [-true]]
+
+    # renumber the variables that are left in the order they first occur
+    number = {}
+    for clause in clauses:
+        for i, l in enumerate(clause):
+            number.setdefault(abs(l), len(number) + 1)
+            clause[i] = number[abs(l)] if l > 0 else -number[abs(l)]
+    var_to_int = {s: number[v] for s, v in symbols.items() if v in number}
+    int_to_var = {v: s for s, v in var_to_int.items()}
+    return clauses, var_to_int, int_to_var
+
+
+def tseitin_transformation(formula, polarity=False):
+    """
+    The CNF of tseitin_dimacs as a pysmt formula, with a P_i symbol for the auxiliary variable i.
+    """
+    clauses, var_to_int, int_to_var = tseitin_dimacs(formula, polarity)
+
+    def lit(l):
+        var = int_to_var[abs(l)] if abs(l) in int_to_var else Symbol(f"P_{abs(l)}")
+        return var if l > 0 else Not(var)
+
+    return And([Or([lit(l) for l in clause]) for clause in clauses])
 
 
 # Example usage: